@@ -1,16 +1,45 @@
 #!/usr/bin/env python3
 
+import os
 import torch
+from functools import lru_cache
 from PIL import Image
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, List, Optional
 from transformers import AutoImageProcessor, AutoModelForImageClassification
 import logging
+try:
+    from torchvision.transforms import v2
+    TORCHVISION_V2_AVAILABLE = True
+except ImportError:
+    TORCHVISION_V2_AVAILABLE = False
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
 
 # Setup logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Substrings that identify AI-generated vs human labels across model label formats
+AI_TOKENS = frozenset({"ai", "artificial", "generated", "fake"})
+HUMAN_TOKENS = frozenset({"hum", "human", "real", "authentic", "natural"})
+
+# Exported ONNX graphs, one per model id, next to this module rather than the working directory
+ONNX_DIR = Path(__file__).parent / "models"
+
+class _LogitsOnly(torch.nn.Module):
+    """Wraps an HF classifier so ONNX export sees a plain pixel_values -> logits graph."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model(pixel_values=pixel_values).logits
+
 class RealAteeqqDetector:
     """AI Detector using Ateeqq/ai-vs-human-image-detector."""
 
@@ -18,6 +47,13 @@ class RealAteeqqDetector:
         self.name = "Real Ateeqq AI Detector"
         self.model_id = "Ateeqq/ai-vs-human-image-detector"
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.input_size = None
+        self.transform = None
+        self.dtype = torch.float32
+        self.ort_session = None
+        self.channels_last = False
+        self._label_cache: Dict[str, str] = {}
+        self._preprocessed = lru_cache(maxsize=256)(self._preprocess_uncached)
 
         try:
             logger.info("📥 Loading model and processor...")
@@ -47,50 +83,224 @@ class RealAteeqqDetector:
                 from transformers import ViTImageProcessor
                 self.processor = ViTImageProcessor.from_pretrained("google/vit-base-patch16-224")
 
+            # Fixed (height, width) processors let us shrink uploads in uint8 before
+            # the processor converts them to float32
+            size = getattr(self.processor, 'size', None) or {}
+            if 'height' in size and 'width' in size:
+                self.input_size = (size['width'], size['height'])
+                self.resample = getattr(self.processor, 'resample', None) or Image.BILINEAR
+                self._build_transform()
+
+            # Inference runs under torch.inference_mode() per call, which also covers the
+            # executor threads; the intra-op thread cap is set once at server startup
             self.model.eval()
+
+            # ONNX Runtime is opt-in (AI_DETECTOR_ORT=1) so the FP16/INT8/compile path stays
+            # the default; the PyTorch model is kept for its config/labels either way
+            if os.environ.get("AI_DETECTOR_ORT") == "1":
+                self._load_onnx_session()
+            if self.ort_session is None:
+                # FP16 weights on GPU; on CPU keep FP32 weights and run matmuls in BF16 via autocast
+                if self.device == "cuda":
+                    self.model = self.model.half()
+                    self.dtype = torch.float16
+                else:
+                    self.dtype = torch.bfloat16
+                    self._quantize_for_cpu()
+
+                # NHWC suits oneDNN and tensor-core conv kernels (e.g. the ResNet fallback)
+                if any(isinstance(m, torch.nn.Conv2d) for m in self.model.modules()):
+                    self.model = self.model.to(memory_format=torch.channels_last)
+                    self.channels_last = True
+
+                self._compile_and_warmup()
+
+            self._init_normalization()
             self.model_loaded = True
             logger.info(f"✅ Loaded model '{self.model_id}' on {self.device}")
         except Exception as e:
             logger.error(f"❌ Failed to load model: {e}")
             self.model_loaded = False
 
-    def detect_ai_image(self, image_path: str) -> Tuple[str, float]:
+    def _build_transform(self):
+        """Set up torchvision uint8 preprocessing and capture the processor's mean/std."""
+        if not TORCHVISION_V2_AVAILABLE:
+            return
+
+        mean = getattr(self.processor, 'image_mean', None)
+        std = getattr(self.processor, 'image_std', None)
+        if mean is None or std is None or not getattr(self.processor, 'do_normalize', True):
+            return
+
+        # Images are already resized to input_size by _load_image, so the transform only
+        # produces uint8 CHW tensors; rescale + normalize run in _normalize on the
+        # inference device against the precomputed mean/std
+        self.transform = v2.PILToTensor()
+        self._image_mean = list(mean)
+        self._image_std = list(std)
+        logger.info("🧮 Using precomputed torchvision preprocessing")
+
+    def _init_normalization(self):
+        """Allocate mean/std once on the device and dtype the model consumes."""
+        if self.transform is None:
+            return
+
+        # ORT takes FP32 numpy input; FP16 only pays off on the GPU
+        if self.ort_session is None and self.device == "cuda":
+            self._norm_device, self._norm_dtype = self.device, self.dtype
+        else:
+            self._norm_device, self._norm_dtype = "cpu", torch.float32
+
+        self._mean = torch.tensor(self._image_mean, device=self._norm_device, dtype=self._norm_dtype).view(1, 3, 1, 1)
+        self._std = torch.tensor(self._image_std, device=self._norm_device, dtype=self._norm_dtype).view(1, 3, 1, 1)
+
+    def _normalize(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        """Rescale and normalize uint8 pixels with in-place ops (the dtype cast makes the copy)."""
+        x = pixel_values.to(self._norm_device, non_blocking=True).to(self._norm_dtype)
+        return x.div_(255).sub_(self._mean).div_(self._std)
+
+    def _load_onnx_session(self):
+        """Export the classifier to ONNX once and serve it from an optimized ORT session."""
+        if not ONNXRUNTIME_AVAILABLE:
+            return
+
+        onnx_path = ONNX_DIR / f"{self.model_id.split('/')[-1]}.onnx"
+        try:
+            if not onnx_path.exists():
+                logger.info(f"📦 Exporting model to ONNX: {onnx_path}")
+                onnx_path.parent.mkdir(parents=True, exist_ok=True)
+                width, height = self.input_size or (224, 224)
+                dummy = torch.zeros(1, 3, height, width, device=self.device)
+                torch.onnx.export(
+                    _LogitsOnly(self.model),
+                    (dummy,),
+                    str(onnx_path),
+                    input_names=["pixel_values"],
+                    output_names=["logits"],
+                    dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+                    opset_version=17
+                )
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            available = ort.get_available_providers()
+            providers = [p for p in ["CUDAExecutionProvider", "CPUExecutionProvider"] if p in available]
+            self.ort_session = ort.InferenceSession(str(onnx_path), options, providers=providers)
+            logger.info(f"⚡ Using ONNX Runtime session ({self.ort_session.get_providers()[0]})")
+        except Exception as e:
+            logger.warning(f"⚠️ ONNX Runtime unavailable for this model, using PyTorch: {e}")
+            self.ort_session = None
+
+    def _quantize_for_cpu(self):
+        """Dynamically quantize Linear layers to INT8 for faster CPU inference."""
+        try:
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            # Quantized linears expect FP32 activations, so BF16 autocast is turned off
+            self.dtype = torch.float32
+            logger.info("🗜️ Applied dynamic INT8 quantization for CPU inference")
+        except Exception as e:
+            logger.warning(f"⚠️ INT8 quantization failed, keeping BF16 autocast: {e}")
+
+    def _compile_and_warmup(self, warmup_steps: int = 2):
+        """Compile the model and run warmup passes so the first request skips JIT latency."""
+        if not hasattr(torch, "compile"):
+            return
+
+        eager_model = self.model
+        width, height = self.input_size or (224, 224)
+        dummy = torch.zeros(1, 3, height, width, device=self.device)
+
+        try:
+            self.model = torch.compile(eager_model, mode="reduce-overhead", dynamic=False)
+            with torch.inference_mode():
+                for _ in range(warmup_steps):
+                    self._logits(dummy)
+            logger.info(f"⚡ Model compiled and warmed up ({warmup_steps} passes)")
+        except Exception as e:
+            logger.warning(f"⚠️ torch.compile failed, using eager model: {e}")
+            self.model = eager_model
+
+    def _logits(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        """Run the classifier (ORT session or PyTorch under autocast) and return its logits."""
+        if pixel_values.dtype == torch.uint8:
+            pixel_values = self._normalize(pixel_values)
+
+        if self.ort_session is not None:
+            logits = self.ort_session.run(None, {"pixel_values": pixel_values.cpu().numpy()})[0]
+            return torch.from_numpy(logits)
+
+        pixel_values = pixel_values.to(self.device)
+        if self.device == "cuda":
+            pixel_values = pixel_values.to(self.dtype)
+        if self.channels_last:
+            pixel_values = pixel_values.contiguous(memory_format=torch.channels_last)
+        # Scripted submodules skip shape re-profiling; scoped to this call, since the
+        # TorchScript executor settings are otherwise process-wide
+        with torch.jit.optimized_execution(False), \
+                torch.autocast(self.device, dtype=self.dtype, enabled=self.dtype != torch.float32):
+            return self.model(pixel_values=pixel_values).logits
+
+    def _load_image(self, image_path: str) -> Image.Image:
+        """Open an image as RGB, pre-resized to the model input size when known."""
+        image = Image.open(image_path).convert("RGB")
+        if self.input_size and image.size != self.input_size:
+            image = image.resize(self.input_size, self.resample)
+        return image
+
+    def _preprocess_uncached(self, image_path: str, mtime_ns: int) -> torch.Tensor:
+        # uint8 when the torchvision transform is used (normalized later in _logits)
+        image = self._load_image(image_path)
+        if self.transform is not None:
+            return self.transform(image).unsqueeze(0)
+        return self.processor(images=image, return_tensors="pt")["pixel_values"]
+
+    def preprocess(self, image_path: str) -> torch.Tensor:
+        """Returns CPU pixel_values for an image, reusing the cached tensor while the file is unchanged."""
+        # The mtime is part of the cache key, so re-uploading to the same path invalidates it
+        return self._preprocessed(str(image_path), os.stat(image_path).st_mtime_ns)
+
+    def detect_ai_image(self, image_path: str, pixel_values: Optional[torch.Tensor] = None) -> Tuple[str, float]:
         """Returns label and confidence whether AI or Human."""
         if not self.model_loaded:
             return "Unknown", 0.0
 
         try:
-            image = Image.open(image_path).convert("RGB")
-            inputs = self.processor(images=image, return_tensors="pt").to(self.device)
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                probs = torch.softmax(outputs.logits, dim=1)
+            if pixel_values is None:
+                pixel_values = self.preprocess(image_path)
+            with torch.inference_mode():
+                logits = self._logits(pixel_values)[0].float()
 
-                # Get all probabilities for debugging
-                all_probs = probs[0].tolist()
-                logger.info(f"🔍 All probabilities: {all_probs}")
+                # Softmax is monotonic, so argmax on the logits picks the same class
+                pred = int(logits.argmax())
+                confidence = float(torch.softmax(logits, dim=0)[pred])
 
-                pred = torch.argmax(probs).item()
-                confidence = probs[0][pred].item()
+                debug = logger.isEnabledFor(logging.DEBUG)
+                if debug:
+                    logger.debug("🔍 All probabilities: %s", torch.softmax(logits, dim=0).tolist())
 
                 # Handle different model label formats
                 if hasattr(self.model.config, 'id2label') and self.model.config.id2label:
                     label = self.model.config.id2label[pred]
-                    logger.info(f"🏷️  Model labels: {self.model.config.id2label}")
-                    logger.info(f"🎯 Predicted class {pred}: {label}")
+                    if debug:
+                        logger.debug("🏷️  Model labels: %s", self.model.config.id2label)
+                        logger.debug("🎯 Predicted class %d: %s", pred, label)
                 else:
                     # Fallback for models without proper labels
                     # For Ateeqq model, let's check both possibilities
-                    if len(all_probs) == 2:
+                    all_logits = logits.tolist()
+                    if len(all_logits) == 2:
                         # Binary classification - check which is higher
                         if pred == 0:
-                            label = "human" if all_probs[0] > all_probs[1] else "ai"
+                            label = "human" if all_logits[0] > all_logits[1] else "ai"
                         else:
-                            label = "ai" if all_probs[1] > all_probs[0] else "human"
+                            label = "ai" if all_logits[1] > all_logits[0] else "human"
                     else:
                         label = "ai" if pred == 1 else "human"
 
-                    logger.info(f"🔄 Using fallback labels - Class {pred}: {label}")
+                    if debug:
+                        logger.debug("🔄 Using fallback labels - Class %d: %s", pred, label)
 
             logger.info(f"✅ Final prediction: {label} ({confidence:.3f})")
             return label, confidence
@@ -98,6 +308,53 @@ class RealAteeqqDetector:
             logger.error(f"❌ Detection failed: {e}")
             return "Unknown", 0.0
 
+    def detect_ai_image_batch(self, paths: List[str]) -> Tuple[List[str], List[float]]:
+        """Returns labels and confidences for several images using one forward pass."""
+        if not self.model_loaded:
+            return ["Unknown"] * len(paths), [0.0] * len(paths)
+
+        try:
+            images = [self._load_image(p) for p in paths]
+            if self.transform is not None:
+                pixel_values = torch.stack([self.transform(image) for image in images])
+            else:
+                pixel_values = self.processor(images=images, return_tensors="pt")["pixel_values"]
+            if self.device == "cuda" and self.ort_session is None:
+                # Pinned host memory lets the H2D copy overlap with compute
+                pixel_values = pixel_values.pin_memory().to(self.device, non_blocking=True)
+
+            with torch.inference_mode():
+                probs = torch.softmax(self._logits(pixel_values).float(), dim=1)
+                confidences, preds = probs.max(dim=1)
+
+            id2label = getattr(self.model.config, 'id2label', None)
+            labels = []
+            for pred in preds.tolist():
+                if id2label:
+                    labels.append(id2label[pred])
+                else:
+                    labels.append("ai" if pred == 1 else "human")
+
+            logger.info(f"✅ Batch prediction for {len(paths)} images: {labels}")
+            return labels, confidences.tolist()
+        except Exception as e:
+            logger.error(f"❌ Batch detection failed: {e}")
+            return ["Unknown"] * len(paths), [0.0] * len(paths)
+
+    def _label_category(self, label_lower: str) -> str:
+        """Classify a lower-cased model label as "human", "ai" or "unknown" (memoized)."""
+        category = self._label_cache.get(label_lower)
+        if category is None:
+            # "hum" or "human" means real photo; "ai" means AI generated
+            if any(token in label_lower for token in HUMAN_TOKENS):
+                category = "human"
+            elif any(token in label_lower for token in AI_TOKENS):
+                category = "ai"
+            else:
+                category = "unknown"
+            self._label_cache[label_lower] = category
+        return category
+
     def check_if_image_is_ai(self, image_path: str) -> Dict[str, Any]:
         """Returns a detailed AI detection result."""
         if not Path(image_path).exists():
@@ -109,34 +366,20 @@ class RealAteeqqDetector:
         label, confidence = self.detect_ai_image(image_path)
 
         # Debug: Print the raw output to understand what the model is returning
-        logger.info(f"🔍 Raw model output - Label: '{label}', Confidence: {confidence}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔍 Raw model output - Label: '%s', Confidence: %s", label, confidence)
 
         # Handle different possible label formats from the Ateeqq model
         label_lower = label.lower()
 
-        # FIXED: Check for AI indicators - "ai" means AI generated
-        is_ai = (
-            "ai" in label_lower or
-            "artificial" in label_lower or
-            "generated" in label_lower or
-            "fake" in label_lower
-        )
-
-        # FIXED: Check for human indicators - "hum" or "human" means real photo
-        is_human = (
-            "hum" in label_lower or
-            "human" in label_lower or
-            "real" in label_lower or
-            "authentic" in label_lower or
-            "natural" in label_lower
-        )
+        category = self._label_category(label_lower)
 
         # FIXED: Determine prediction based on actual model output
-        if is_human:  # Check human first since it's more common
+        if category == "human":  # Check human first since it's more common
             prediction = "Real Photo"
             real_prob = confidence
             ai_prob = 1 - confidence
-        elif is_ai:
+        elif category == "ai":
             prediction = "AI Generated"
             ai_prob = confidence
             real_prob = 1 - confidence
@@ -3,10 +3,17 @@
 Simple FastAPI Server for Health Check Testing
 """
 
+import asyncio
+import concurrent.futures
+import io
 import logging
+import os
+import threading
 import uuid
+from collections import OrderedDict
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -40,15 +47,6 @@ except ImportError as e:
     MORPH_DETECTOR_AVAILABLE = False
     print(f"⚠️  Photo morph detector not available: {e}")
 
-# Try to import photo morph detector
-try:
-    from photo_morph_detector import PhotoMorphDetector
-    MORPH_DETECTOR_AVAILABLE = True
-    print("✅ Photo morph detector module available")
-except ImportError as e:
-    MORPH_DETECTOR_AVAILABLE = False
-    print(f"⚠️  Photo morph detector not available: {e}")
-
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -74,65 +72,168 @@ UPLOAD_DIR = Path("uploads")
 OUTPUT_DIR = Path("outputs")
 UPLOAD_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR.mkdir(exist_ok=True)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# image_id -> saved file, so lookups don't stat every candidate extension
+ID_TO_PATH: Dict[str, Path] = {}
+
+# Recently uploaded bytes, so the header probe and the detectors decode from memory
+# instead of re-reading the file. Bounded LRU; guarded by a threading lock because
+# uploads are saved from executor threads
+UPLOAD_MEM_MAX_FILE = 16 * 1024 * 1024
+UPLOAD_MEM_MAX_BYTES = 128 * 1024 * 1024
+UPLOAD_MEM: "OrderedDict[str, bytes]" = OrderedDict()
+UPLOAD_MEM_LOCK = threading.Lock()
+upload_mem_bytes = 0
 
 # Mount static files
 app.mount("/outputs", StaticFiles(directory="outputs"), name="outputs")
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
-# Initialize the working Ateeqq detector
+# Detectors are loaded lazily on the first request that needs them, so server
+# startup does not pay for models a client may never use
 ai_detector = None
-print("🔄 Initializing working Ateeqq detector...")
+morph_detector = None
+detector_lock: Optional[asyncio.Lock] = None
 
-if AI_DETECTOR_AVAILABLE:
+@lru_cache(maxsize=1)
+def get_ai_detector():
+    """Load the working Ateeqq detector once; returns None if it is unavailable."""
+    if not AI_DETECTOR_AVAILABLE:
+        print("⚠️  Ateeqq detector module not available, using simulation")
+        return None
+
+    print("🔄 Initializing working Ateeqq detector...")
     try:
         print("📥 Loading working Ateeqq detector (using real model)...")
         # Use threshold=0.95 for VERY strict detection (avoid false positives)
         # Only flag images as AI if model is >95% confident
-        ai_detector = AteeqqFinalWorking(ai_threshold=0.95)
-        if hasattr(ai_detector, 'model_loaded') and ai_detector.model_loaded:
+        detector = AteeqqFinalWorking(ai_threshold=0.95)
+        if hasattr(detector, 'model_loaded') and detector.model_loaded:
             print("✅ Working Ateeqq detector initialized successfully!")
             print(f"   AI Detection Threshold: 95% (very strict - favors real photos)")
-        else:
-            print("⚠️  Ateeqq detector failed to load, using simulation")
-            ai_detector = None
+            return detector
+        print("⚠️  Ateeqq detector failed to load, using simulation")
     except Exception as e:
         print(f"⚠️  Failed to initialize Ateeqq detector: {e}")
         print("🔄 Falling back to simulated AI detection")
-        ai_detector = None
-else:
-    print("⚠️  Ateeqq detector module not available, using simulation")
+    return None
 
-# Initialize the photo morph detector
-morph_detector = None
-print("🔄 Initializing photo morph detector...")
+@lru_cache(maxsize=1)
+def get_morph_detector():
+    """Load the photo morph detector once; returns None if it is unavailable."""
+    if not MORPH_DETECTOR_AVAILABLE:
+        print("⚠️  Photo morph detector module not available, using simulation")
+        return None
 
-if MORPH_DETECTOR_AVAILABLE:
+    print("🔄 Initializing photo morph detector...")
     try:
         print("📥 Loading photo morph detector...")
-        morph_detector = PhotoMorphDetector()
+        detector = PhotoMorphDetector()
         print("✅ Photo morph detector initialized successfully!")
+        return detector
     except Exception as e:
         print(f"⚠️  Failed to initialize photo morph detector: {e}")
         print("🔄 Falling back to simulated morph detection")
-        morph_detector = None
-else:
-    print("⚠️  Photo morph detector module not available, using simulation")
+    return None
 
-# Initialize the photo morph detector
-morph_detector = None
-print("🔄 Initializing photo morph detector...")
+# Dynamic batching for /ai-detect: pending requests are collected for a short
+# window and run through the model as one batched forward pass.
+MAX_BATCH = 16
+MAX_WAIT_MS = 10
+ai_detect_queue: Optional[asyncio.Queue] = None
+# Held so the consumer task is not garbage-collected and can be cancelled on shutdown
+ai_batch_task: Optional[asyncio.Task] = None
+
+# Intra-op thread cap for every model in this process, so concurrent requests don't
+# oversubscribe the CPU. Process-wide, hence set once at startup rather than per detector
+TORCH_NUM_THREADS = int(os.environ.get("TORCH_NUM_THREADS", min(4, os.cpu_count() or 1)))
+
+# Model inference runs off the event loop; one worker since PyTorch already
+# parallelizes the forward pass internally (and releases the GIL while doing so)
+INFER_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="infer")
+
+# Morph analysis is CPU-bound OpenCV/NumPy work with its own analyzer threads; a separate
+# pool keeps it from queueing behind (or blocking) AI-detection batches on INFER_POOL
+MORPH_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="morph")
+
+async def ai_batch_worker():
+    """Drain queued /ai-detect requests and resolve them from one batched forward pass."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await ai_detect_queue.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(ai_detect_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        image_paths = [image_path for image_path, _, _ in batch]
+        image_bytes = [content for _, content, _ in batch]
+        try:
+            results = await loop.run_in_executor(
+                INFER_POOL, ai_detector.check_if_image_is_ai_batch, image_paths, image_bytes
+            )
+        except Exception as e:
+            logger.error(f"❌ Batched AI detection failed: {e}")
+            results = [{'success': False, 'error': str(e)} for _ in batch]
+
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+@app.on_event("startup")
+async def create_detector_lock():
+    """Create the detector lock on the server's event loop."""
+    global detector_lock
+    detector_lock = asyncio.Lock()
 
-if MORPH_DETECTOR_AVAILABLE:
     try:
-        print("📥 Loading photo morph detector...")
-        morph_detector = PhotoMorphDetector()
-        print("✅ Photo morph detector initialized successfully!")
-    except Exception as e:
-        print(f"⚠️  Failed to initialize photo morph detector: {e}")
-        print("🔄 Falling back to simulated morph detection")
-        morph_detector = None
-else:
-    print("⚠️  Photo morph detector module not available, using simulation")
+        import torch
+        torch.set_num_threads(TORCH_NUM_THREADS)
+        logger.info(f"🧵 Torch intra-op threads: {TORCH_NUM_THREADS}")
+    except ImportError:
+        pass
+
+@app.on_event("shutdown")
+async def stop_ai_batch_worker():
+    """Cancel the /ai-detect batching consumer."""
+    global ai_batch_task
+    if ai_batch_task is not None:
+        ai_batch_task.cancel()
+        try:
+            await ai_batch_task
+        except asyncio.CancelledError:
+            pass
+        ai_batch_task = None
+
+async def ensure_ai_detector():
+    """Load the AI detector on first use and start its batching consumer."""
+    global ai_detector, ai_detect_queue, ai_batch_task
+    if ai_detector is None:
+        async with detector_lock:
+            if ai_detector is None:
+                # Model loading is slow; keep it off the event loop
+                ai_detector = await asyncio.get_running_loop().run_in_executor(INFER_POOL, get_ai_detector)
+                if ai_detector is not None and ai_detect_queue is None:
+                    ai_detect_queue = asyncio.Queue()
+                    ai_batch_task = asyncio.create_task(ai_batch_worker())
+                    logger.info(f"📦 AI detection batching enabled (max batch {MAX_BATCH}, wait {MAX_WAIT_MS} ms)")
+    return ai_detector
+
+async def ensure_morph_detector():
+    """Load the morph detector on first use."""
+    global morph_detector
+    if morph_detector is None:
+        async with detector_lock:
+            if morph_detector is None:
+                morph_detector = await asyncio.get_running_loop().run_in_executor(INFER_POOL, get_morph_detector)
+    return morph_detector
 
 def save_uploaded_file(upload_file: UploadFile) -> str:
     """Save uploaded file and return unique ID."""
@@ -143,17 +244,54 @@ def save_uploaded_file(upload_file: UploadFile) -> str:
 
     file_path = UPLOAD_DIR / f"{file_id}{file_extension}"
 
-    with open(file_path, "wb") as buffer:
-        content = upload_file.file.read()
-        buffer.write(content)
-
+    # Stream in 1 MiB chunks so large uploads are never held in memory whole;
+    # chunks of small files are kept for the in-memory cache
+    chunks = []
+    total = 0
+    with open(file_path, "wb", buffering=UPLOAD_CHUNK_SIZE) as buffer:
+        while True:
+            chunk = upload_file.file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer.write(chunk)
+            total += len(chunk)
+            if total <= UPLOAD_MEM_MAX_FILE:
+                chunks.append(chunk)
+
+    ID_TO_PATH[file_id] = file_path
+    if total <= UPLOAD_MEM_MAX_FILE:
+        remember_upload_bytes(file_id, b"".join(chunks))
     return file_id
 
+def remember_upload_bytes(image_id: str, content: bytes):
+    """Keep uploaded bytes in memory, evicting the oldest entries past the budget."""
+    global upload_mem_bytes
+    with UPLOAD_MEM_LOCK:
+        UPLOAD_MEM[image_id] = content
+        upload_mem_bytes += len(content)
+        while upload_mem_bytes > UPLOAD_MEM_MAX_BYTES and UPLOAD_MEM:
+            _, evicted = UPLOAD_MEM.popitem(last=False)
+            upload_mem_bytes -= len(evicted)
+
+def get_image_bytes(image_id: str) -> Optional[bytes]:
+    """Get the bytes of a recent upload, or None if they are not cached."""
+    with UPLOAD_MEM_LOCK:
+        content = UPLOAD_MEM.get(image_id)
+        if content is not None:
+            UPLOAD_MEM.move_to_end(image_id)
+        return content
+
 def get_image_path(image_id: str) -> Optional[Path]:
     """Get image path from ID."""
+    path = ID_TO_PATH.get(image_id)
+    if path is not None:
+        return path
+
+    # Not uploaded by this process (e.g. after a restart) - probe the disk once
     for ext in [".jpg", ".jpeg", ".png", ".webp"]:
         path = UPLOAD_DIR / f"{image_id}{ext}"
         if path.exists():
+            ID_TO_PATH[image_id] = path
             return path
     return None
 
@@ -187,15 +325,17 @@ async def upload_image(file: UploadFile = File(...)):
             raise HTTPException(status_code=400, detail="File must be an image")
 
         # Save file
-        file_id = save_uploaded_file(file)
+        file_id = await asyncio.get_running_loop().run_in_executor(None, save_uploaded_file, file)
         file_path = get_image_path(file_id)
 
         if not file_path:
             raise HTTPException(status_code=500, detail="Failed to save file")
 
-        # Get image info
+        # Get image info - Image.open only parses the header; size and format are
+        # available without decoding pixels, so avoid load()/convert() here
+        content = get_image_bytes(file_id)
         try:
-            with Image.open(file_path) as image:
+            with Image.open(io.BytesIO(content) if content is not None else file_path) as image:
                 size = image.size
                 format_name = image.format
         except Exception:
@@ -227,10 +367,19 @@ async def ai_detect_endpoint(image_id: str = Form(...)):
             raise HTTPException(status_code=404, detail="Image not found")
 
         # Check if your AI detector is available
+        ai_detector = await ensure_ai_detector()
         if ai_detector and hasattr(ai_detector, 'model_loaded') and ai_detector.model_loaded:
             # Use your real AI detection
             logger.info(f"🔍 Running your AI detection on image: {image_path}")
-            result = ai_detector.check_if_image_is_ai(str(image_path))
+            content = get_image_bytes(image_id)
+            if ai_detect_queue is not None:
+                future = asyncio.get_running_loop().create_future()
+                await ai_detect_queue.put((str(image_path), content, future))
+                result = await future
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    INFER_POOL, ai_detector.check_if_image_is_ai, str(image_path), content
+                )
 
             if result['success']:
                 # Format the response with detailed information from your detector
@@ -288,12 +437,7 @@ async def remove_background_endpoint(image_id: str):
             raise HTTPException(status_code=503, detail="Background remover service not available")
 
         # Find image file
-        image_path = None
-        for ext in ['.jpg', '.jpeg', '.png', '.webp']:
-            potential_path = UPLOAD_DIR / f"{image_id}{ext}"
-            if potential_path.exists():
-                image_path = potential_path
-                break
+        image_path = get_image_path(image_id)
 
         if not image_path:
             logger.error(f"❌ Image {image_id} not found")
@@ -308,6 +452,7 @@ async def remove_background_endpoint(image_id: str):
         # Use your background remover function
         from background_remover import remove_background as bg_remove
         output_path = bg_remove(str(image_path), str(result_path))
+        ID_TO_PATH[result_id] = Path(output_path)
 
         # Create metadata
         metadata = {
@@ -386,10 +531,14 @@ async def morph_detect_endpoint(image_id: str = Form(...)):
             raise HTTPException(status_code=404, detail="Image not found")
 
         # Check if morph detector is available
+        morph_detector = await ensure_morph_detector()
         if morph_detector:
             # Use real morph detection
             logger.info(f"🔍 Running morph detection on image: {image_path}")
-            result = morph_detector.detect_morph(str(image_path))
+            result = await asyncio.get_running_loop().run_in_executor(
+                MORPH_POOL,
+                partial(morph_detector.detect_morph, str(image_path), image_bytes=get_image_bytes(image_id))
+            )
 
             if result['success']:
                 # Format the response with detailed information
@@ -6,19 +6,99 @@ Ateeqq Final Working - Uses the downloaded Ateeqq model with config fix
 import torch
 from PIL import Image
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, List, Optional
+from collections import OrderedDict
 import logging
+import threading
 import json
+import hashlib
+import io
 import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tensorrt as trt
+    TENSORRT_AVAILABLE = True
+except ImportError:
+    TENSORRT_AVAILABLE = False
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+try:
+    from torchao.quantization import quantize_
+    try:
+        from torchao.quantization import Int8WeightOnlyConfig
+    except ImportError:
+        from torchao.quantization import int8_weight_only as Int8WeightOnlyConfig
+    TORCHAO_AVAILABLE = True
+except ImportError:
+    TORCHAO_AVAILABLE = False
+
+try:
+    from torchvision.io import ImageReadMode, decode_image, decode_jpeg, read_file
+    from torchvision.transforms import v2
+    TORCHVISION_V2_AVAILABLE = True
+except ImportError:
+    TORCHVISION_V2_AVAILABLE = False
 
 # Setup logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Model class order: class 0 is ai, class 1 is human
+LABELS = ("ai", "human")
+
+# Local snapshot of the Ateeqq model (config fixed up on first load)
+MODEL_PATH = Path("./models/ai-vs-human-image-detector")
+
+# Max predictions remembered per detector instance
+PREDICTION_CACHE_SIZE = 1024
+
+# Image decode workers shared by every detector instance; threads start lazily on first use
+_DECODE_POOL = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="ateeqq-decode")
+
+@torch.jit.script
+def _decide(logits: torch.Tensor, ai_threshold: float) -> torch.Tensor:
+    """Threshold decision on device; returns a (2, N) tensor of class ids and confidences."""
+    # Two-class softmax reduces to a sigmoid of the logit margin
+    ai_prob = torch.sigmoid(logits[:, 0].float() - logits[:, 1].float())
+    human_prob = 1.0 - ai_prob
+    is_ai = ai_prob >= ai_threshold
+    # Anything not confidently AI defaults to human (real photo) to avoid false positives;
+    # uncertain predictions still get at least medium confidence
+    confidence = torch.where(
+        is_ai, ai_prob,
+        torch.where(human_prob >= ai_threshold, human_prob, human_prob.clamp_min(0.6))
+    )
+    return torch.stack((torch.logical_not(is_ai).to(confidence.dtype), confidence))
+
+class _LogitsOnly(torch.nn.Module):
+    """Wraps an HF classifier so ONNX export sees a plain pixel_values -> logits graph."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model(pixel_values=pixel_values).logits
+
 class AteeqqFinalWorking:
     """Ateeqq Final Working detector using the downloaded model with config fix."""
 
-    def __init__(self, ai_threshold=0.90):
+    # Loaded state shared by every instance, keyed by use_int8_ffn
+    _SHARED_ATTRS = (
+        "model", "processor", "dtype", "trt_engine", "trt_context", "ort_session",
+        "_gpu_preproc", "_graph", "_graph_lock", "_static_input", "_static_logits", "_compiled_model"
+    )
+    _loaded_weights: Dict[bool, Dict[str, Any]] = {}
+
+    def __init__(self, ai_threshold=0.90, use_int8_ffn=False):
         """
         Initialize the detector.
         
@@ -28,59 +108,59 @@ class AteeqqFinalWorking:
                 - 0.85: Strict - balanced false positives vs false negatives
                 - 0.75: Moderate - more sensitive to AI characteristics
                 - 0.65: Sensitive - flag more images as potentially AI
+            use_int8_ffn (bool): Quantize only the MLP/FFN weights to INT8 (weight-only, needs torchao);
+                attention projections stay in FP16/BF16
         """
         self.name = "Ateeqq Final Working"
         self.model_id = "Ateeqq/ai-vs-human-image-detector"
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.dtype = torch.float32
+        self.trt_engine = None
+        self.trt_context = None
+        self.ort_session = None
+        self._gpu_preproc = None
+        self._graph = None
+        self._graph_lock = None
+        self._static_input = None
+        self._static_logits = None
+        self._compiled_model = None
         self.model_loaded = False
         self.ai_threshold = ai_threshold  # Configurable threshold
+        self.use_int8_ffn = use_int8_ffn
+        # (st_dev, st_ino, st_mtime_ns, st_size) -> (label, confidence); per instance so thresholds never mix
+        self._prediction_cache: "OrderedDict[Tuple[int, int, int, int], Tuple[str, float]]" = OrderedDict()
+        self._prediction_cache_lock = threading.Lock()
         
         logger.info("🎯 Loading Ateeqq model from downloaded files...")
         logger.info(f"⚙️  AI Detection Threshold: {ai_threshold:.2f} (higher = stricter)")
+        if use_int8_ffn in AteeqqFinalWorking._loaded_weights:
+            for name, value in AteeqqFinalWorking._loaded_weights[use_int8_ffn].items():
+                setattr(self, name, value)
+            self.model_loaded = True
+            logger.info("♻️  Reusing already loaded Ateeqq model")
+            return
         self._load_ateeqq_from_cache()
 
+    @classmethod
+    def reset_shared_weights(cls):
+        """Drop the loaded state shared between instances, so the next instance loads afresh."""
+        cls._loaded_weights.clear()
+
     def _load_ateeqq_from_cache(self):
         """Load Ateeqq model from the downloaded cache with config fix."""
         try:
             # Use the direct model directory
-            model_path = Path("./models/ai-vs-human-image-detector")
+            model_path = MODEL_PATH
 
             if not model_path.exists():
                 raise Exception("Ateeqq model not found in models directory")
 
             logger.info(f"📁 Found Ateeqq model at: {model_path}")
             
-            # Read the original config
-            config_path = model_path / "config.json"
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            
-            logger.info(f"📋 Original config: {config}")
-            
-            # Fix the config by adding the missing model_type
-            if 'model_type' not in config:
-                # Based on the model architecture, this appears to be a Vision Transformer
-                config['model_type'] = 'vit'
-                logger.info("🔧 Added model_type: vit to config")
-            
-            # Ensure proper labels for binary classification
-            if 'id2label' not in config:
-                config['id2label'] = {"0": "human", "1": "ai"}
-                config['label2id'] = {"human": 0, "ai": 1}
-                logger.info("🏷️ Added labels: human=0, ai=1")
-            
-            # Save the fixed config
-            fixed_config_path = model_path / "config_fixed.json"
-            with open(fixed_config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2)
-            
-            logger.info(f"💾 Fixed config saved to: {fixed_config_path}")
+            self._fix_config(model_path)
             
             # Now load the model with the correct SigLIP architecture
-            from transformers import AutoConfig, AutoModelForImageClassification, AutoImageProcessor
-
-            # Load the config (it already has the correct model_type: siglip)
-            model_config = AutoConfig.from_pretrained(str(model_path), local_files_only=True)
+            from transformers import AutoModelForImageClassification, AutoImageProcessor
 
             # Create the SigLIP model
             logger.info("🔧 Creating SigLIP model...")
@@ -89,6 +169,11 @@ class AteeqqFinalWorking:
                 local_files_only=True,
                 ignore_mismatched_sizes=True
             )
+
+            # INT8 PTQ makes ViT/SigLIP encoders slower (Q/DQ nodes don't fuse in attention)
+            model_type = self.model.config.model_type
+            if os.environ.get("TORCH_QUANTIZE", "").lower() == "int8" and model_type in ("siglip", "vit"):
+                logger.warning(f"⚠️  TORCH_QUANTIZE=int8 ignored for {model_type} backbone - using FP16/BF16 on GPU")
             
             # Load processor
             try:
@@ -103,9 +188,32 @@ class AteeqqFinalWorking:
                 from transformers import SiglipImageProcessor
                 self.processor = SiglipImageProcessor.from_pretrained("google/siglip-base-patch16-224")
             
-            self.model.to(self.device)
             self.model.eval()
+            self._build_or_load_trt_engine(model_path)
+            # ONNX Runtime is opt-in (ATEEQQ_ORT=1) so the FP16/compile/CUDA-graph path stays the default
+            if self.trt_context is None and os.environ.get("ATEEQQ_ORT") == "1":
+                self._load_via_onnxruntime(model_path)
+            # ORT takes FP32 host input, so GPU-decoded tensors would only be copied back
+            if self.ort_session is None:
+                self._build_gpu_preproc()
+
+            # When an engine/session serves, the torch model stays on the CPU for its config only
+            if self.trt_context is None and self.ort_session is None:
+                # Half precision on GPU (BF16 where supported); CPU stays in FP32
+                if self.device == "cuda":
+                    self.dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+                self.model = self.model.to(self.device, dtype=self.dtype)
+                if self.device == "cuda":
+                    # NHWC lets the patch-embedding conv coalesce loads on tensor cores
+                    self.model = self.model.to(memory_format=torch.channels_last)
+                if self.use_int8_ffn:
+                    self._quantize_ffn_int8()
+                if self.device == "cuda" and not self._compile_and_warmup():
+                    self._capture_cuda_graph()
             self.model_loaded = True
+            AteeqqFinalWorking._loaded_weights[self.use_int8_ffn] = {
+                name: getattr(self, name) for name in self._SHARED_ATTRS
+            }
             
             logger.info("✅ Ateeqq model loaded successfully with config fix!")
             logger.info(f"🏷️ Model labels: {self.model.config.id2label}")
@@ -115,55 +223,392 @@ class AteeqqFinalWorking:
             self.model_loaded = False
             raise Exception(f"ATEEQQ CACHE LOADING FAILED: {e}")
 
-    def detect_ai_image(self, image_path: str) -> Tuple[str, float]:
+    def _fix_config(self, model_path: Path):
+        """Write config_fixed.json with model_type/labels filled in, only when it would change."""
+        # Read the original config
+        config_path = model_path / "config.json"
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        
+        logger.info(f"📋 Original config keys: {sorted(config.keys())}")
+        
+        # Normal case: the downloaded config is already complete
+        if 'model_type' in config and 'id2label' in config:
+            return
+        
+        # Fix the config by adding the missing model_type
+        if 'model_type' not in config:
+            # Based on the model architecture, this appears to be a Vision Transformer
+            config['model_type'] = 'vit'
+            logger.info("🔧 Added model_type: vit to config")
+        
+        # Ensure proper labels for binary classification
+        if 'id2label' not in config:
+            config['id2label'] = {"0": "human", "1": "ai"}
+            config['label2id'] = {"human": 0, "ai": 1}
+            logger.info("🏷️ Added labels: human=0, ai=1")
+        
+        # Save the fixed config unless an identical one is already on disk
+        fixed_config_path = model_path / "config_fixed.json"
+        config_hash = hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()
+        if fixed_config_path.exists():
+            with open(fixed_config_path, 'r', encoding='utf-8') as f:
+                existing_hash = hashlib.sha1(json.dumps(json.load(f), sort_keys=True).encode()).hexdigest()
+            if existing_hash == config_hash:
+                return
+        
+        with open(fixed_config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=2)
+        
+        logger.info(f"💾 Fixed config saved to: {fixed_config_path}")
+
+    def _input_hw(self) -> Tuple[int, int]:
+        """Return the (height, width) the processor resizes images to."""
+        size = getattr(self.processor, "size", None) or {}
+        return size.get("height", 224), size.get("width", 224)
+
+    def _build_gpu_preproc(self):
+        """Build a resize + rescale + normalize transform that runs on the inference device."""
+        if not TORCHVISION_V2_AVAILABLE:
+            return
+
+        mean = getattr(self.processor, "image_mean", None)
+        std = getattr(self.processor, "image_std", None)
+        if mean is None or std is None:
+            return
+
+        self._gpu_preproc = torch.nn.Sequential(
+            v2.Resize(self._input_hw(), interpolation=v2.InterpolationMode.BICUBIC, antialias=True),
+            v2.ToDtype(torch.float32, scale=True),
+            v2.Normalize(mean=list(mean), std=list(std))
+        ).to(self.device)
+        logger.info(f"🧮 Using torchvision preprocessing on {self.device}")
+
+    def _load_pixels(self, image_path: str, image_bytes: Optional[bytes] = None) -> torch.Tensor:
+        """Decode and preprocess one image into a (3, H, W) tensor (from image_bytes when given)."""
+        if self._gpu_preproc is not None:
+            try:
+                if image_bytes is not None:
+                    data = torch.frombuffer(bytearray(image_bytes), dtype=torch.uint8)
+                else:
+                    data = read_file(str(image_path))
+                if self.device == "cuda" and bytes(data[:2].tolist()) == b"\xff\xd8":
+                    # nvJPEG decodes straight into GPU memory
+                    image = decode_jpeg(data, mode=ImageReadMode.RGB, device=self.device)
+                else:
+                    # Only the decode runs on CPU; resize + normalize run on the device
+                    image = self._to_device(decode_image(data, mode=ImageReadMode.RGB))
+                return self._gpu_preproc(image)
+            except RuntimeError as e:
+                logger.debug(f"torchvision decode failed, using processor: {e}")
+
+        source = io.BytesIO(image_bytes) if image_bytes is not None else image_path
+        image = Image.open(source).convert("RGB")
+        return self.processor(images=image, return_tensors="pt")["pixel_values"][0]
+
+    def _pixel_values(self, image_paths: List[str],
+                      image_bytes: Optional[List[Optional[bytes]]] = None) -> torch.Tensor:
+        """Decode images in parallel and stack them into a single pixel_values batch."""
+        if image_bytes is None:
+            image_bytes = [None] * len(image_paths)
+        if len(image_paths) == 1:
+            return self._load_pixels(image_paths[0], image_bytes[0]).unsqueeze(0)
+        return torch.stack(list(_DECODE_POOL.map(self._load_pixels, image_paths, image_bytes)))
+
+    def _export_onnx(self, model_path: Path) -> Path:
+        """Export the FP32 classifier to ONNX once (dynamic batch) and return its path."""
+        onnx_path = model_path / "siglip.onnx"
+        if not onnx_path.exists():
+            height, width = self._input_hw()
+            logger.info(f"📤 Exporting ONNX model: {onnx_path}")
+            torch.onnx.export(
+                _LogitsOnly(self.model),
+                (torch.zeros(1, 3, height, width),),
+                str(onnx_path),
+                input_names=["pixel_values"],
+                output_names=["logits"],
+                dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+                opset_version=17
+            )
+        return onnx_path
+
+    def _load_via_onnxruntime(self, model_path: Path):
+        """Create an ONNX Runtime session on the TensorRT/CUDA execution providers if present."""
+        if not ONNXRUNTIME_AVAILABLE:
+            return
+
+        available = ort.get_available_providers()
+        providers = []
+        if "TensorrtExecutionProvider" in available:
+            providers.append((
+                "TensorrtExecutionProvider",
+                {
+                    "trt_fp16_enable": True,
+                    "trt_engine_cache_enable": True,
+                    "trt_engine_cache_path": str(model_path)
+                }
+            ))
+        if "CUDAExecutionProvider" in available:
+            providers.append("CUDAExecutionProvider")
+        if not providers:
+            # CPU-only ORT brings no win over the PyTorch path here
+            return
+
+        try:
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.ort_session = ort.InferenceSession(
+                str(self._export_onnx(model_path)), sess_options=options, providers=providers
+            )
+            logger.info(f"⚡ Using ONNX Runtime: {self.ort_session.get_providers()}")
+        except Exception as e:
+            logger.warning(f"⚠️ ONNX Runtime unavailable, using PyTorch: {e}")
+            self.ort_session = None
+
+    def _build_or_load_trt_engine(self, model_path: Path):
+        """Build (once) and load a TensorRT FP16 engine cached next to the checkpoint."""
+        if self.device != "cuda" or not TENSORRT_AVAILABLE:
+            return
+
+        engine_path = model_path / "siglip_fp16.plan"
+        height, width = self._input_hw()
+        try:
+            if not engine_path.exists():
+                trtexec = shutil.which("trtexec")
+                if trtexec is None:
+                    logger.info("ℹ️  trtexec not found - skipping TensorRT engine build")
+                    return
+
+                onnx_path = self._export_onnx(model_path)
+                logger.info(f"🔧 Building TensorRT FP16 engine: {engine_path}")
+                subprocess.run(
+                    [trtexec, f"--onnx={onnx_path}", "--fp16", f"--saveEngine={engine_path}",
+                     f"--shapes=pixel_values:1x3x{height}x{width}"],
+                    check=True, capture_output=True
+                )
+
+            runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+            self.trt_engine = runtime.deserialize_cuda_engine(engine_path.read_bytes())
+            self.trt_context = self.trt_engine.create_execution_context()
+            logger.info(f"⚡ Using TensorRT engine: {engine_path}")
+        except Exception as e:
+            logger.warning(f"⚠️ TensorRT engine unavailable, using PyTorch: {e}")
+            self.trt_context = None
+
+    def _trt_infer(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        """Run the fixed-shape (batch 1) TensorRT engine per image and return FP32 logits."""
+        stream = torch.cuda.current_stream()
+        outputs = []
+        for row in pixel_values.to(self.device, dtype=torch.float32).split(1):
+            row = row.contiguous()
+            self.trt_context.set_input_shape("pixel_values", tuple(row.shape))
+            logits = torch.empty(1, self.model.config.num_labels, device=self.device)
+            self.trt_context.set_tensor_address("pixel_values", row.data_ptr())
+            self.trt_context.set_tensor_address("logits", logits.data_ptr())
+            self.trt_context.execute_async_v3(stream.cuda_stream)
+            outputs.append(logits)
+        stream.synchronize()
+        return torch.cat(outputs)
+
+    def _quantize_ffn_int8(self):
+        """Quantize MLP/FFN linear weights to INT8 (weight-only); attention stays in half precision."""
+        if not TORCHAO_AVAILABLE:
+            logger.warning("⚠️  use_int8_ffn requested but torchao is not installed - skipping")
+            return
+
+        try:
+            quantize_(
+                self.model,
+                Int8WeightOnlyConfig(),
+                filter_fn=lambda module, fqn: isinstance(module, torch.nn.Linear) and ("mlp" in fqn or "fc" in fqn)
+            )
+            logger.info("🗜️  FFN weights quantized to INT8 (weight-only)")
+        except Exception as e:
+            logger.warning(f"⚠️ INT8 FFN quantization failed, keeping {self.dtype}: {e}")
+
+    def _compile_and_warmup(self, warmup_steps: int = 2) -> bool:
+        """Compile the batch-1 forward and warm it up; returns True if compiled."""
+        if not hasattr(torch, "compile"):
+            return False
+
+        height, width = self._input_hw()
+        dummy = torch.zeros(1, 3, height, width, dtype=self.dtype, device=self.device)
+
+        try:
+            # Only batch 1 goes through the compiled model (see _forward): the dynamic batcher
+            # sends sizes 1-16, and each new static shape would recompile and capture a new
+            # CUDA graph while a request waits
+            self._compiled_model = torch.compile(self.model, mode="reduce-overhead", fullgraph=False, dynamic=False)
+            with torch.inference_mode():
+                for _ in range(warmup_steps):
+                    self._forward({"pixel_values": dummy})
+            logger.info(f"⚡ Ateeqq model compiled for single images and warmed up ({warmup_steps} passes)")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ torch.compile failed, using eager model: {e}")
+            self._compiled_model = None
+            return False
+
+    def _capture_cuda_graph(self, warmup_steps: int = 3):
+        """Capture the eager batch-1 forward in a CUDA graph replayed by _forward."""
+        height, width = self._input_hw()
+        static_input = torch.zeros(1, 3, height, width, dtype=self.dtype, device=self.device)
+        static_input = static_input.contiguous(memory_format=torch.channels_last)
+
+        try:
+            with torch.inference_mode(), torch.autocast(device_type="cuda", dtype=self.dtype):
+                # Warm up on a side stream so lazy allocations don't land in the graph
+                stream = torch.cuda.Stream()
+                stream.wait_stream(torch.cuda.current_stream())
+                with torch.cuda.stream(stream):
+                    for _ in range(warmup_steps):
+                        self.model(pixel_values=static_input)
+                torch.cuda.current_stream().wait_stream(stream)
+
+                graph = torch.cuda.CUDAGraph()
+                with torch.cuda.graph(graph):
+                    static_logits = self.model(pixel_values=static_input).logits
+
+            self._graph = graph
+            self._graph_lock = threading.Lock()
+            self._static_input = static_input
+            self._static_logits = static_logits
+            logger.info("⚡ Captured CUDA graph for single-image inference")
+        except Exception as e:
+            logger.warning(f"⚠️ CUDA graph capture failed, using eager model: {e}")
+            self._graph = None
+
+    def _to_device(self, tensor: torch.Tensor, dtype=None) -> torch.Tensor:
+        """Move a tensor to the inference device, via pinned memory for async CUDA copies."""
+        if self.device == "cuda" and tensor.device.type == "cpu":
+            tensor = tensor.pin_memory()
+        return tensor.to(self.device, dtype=dtype, non_blocking=True)
+
+    def _forward(self, inputs) -> torch.Tensor:
+        """Run the model in its inference dtype and return FP32 logits."""
+        if self.trt_context is not None:
+            return self._trt_infer(inputs["pixel_values"])
+        if self.ort_session is not None:
+            pixel_values = inputs["pixel_values"].float().cpu().numpy()
+            return torch.from_numpy(self.ort_session.run(None, {"pixel_values": pixel_values})[0])
+
+        inputs = {
+            k: self._to_device(v, self.dtype if v.is_floating_point() else None)
+            for k, v in inputs.items()
+        }
+        if self._graph is not None and inputs["pixel_values"].shape == self._static_input.shape:
+            # Static buffers are shared, so one replay at a time
+            with self._graph_lock:
+                self._static_input.copy_(inputs["pixel_values"], non_blocking=True)
+                self._graph.replay()
+                return self._static_logits.to(torch.float32, copy=True)
+        if self.device == "cuda":
+            inputs["pixel_values"] = inputs["pixel_values"].contiguous(memory_format=torch.channels_last)
+            model = self.model
+            if self._compiled_model is not None and inputs["pixel_values"].shape[0] == 1:
+                model = self._compiled_model
+            with torch.autocast(device_type="cuda", dtype=self.dtype):
+                return model(**inputs).logits.float()
+        return self.model(**inputs).logits.float()
+
+    @staticmethod
+    def _file_key(image_path: str) -> Tuple[int, int, int, int]:
+        """Identify a file's current contents by inode, mtime and size."""
+        st = os.stat(image_path)
+        return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _cached_prediction(self, key: Tuple[int, int, int, int]) -> Optional[Tuple[str, float]]:
+        """Return a remembered prediction for an unchanged file, if any."""
+        with self._prediction_cache_lock:
+            result = self._prediction_cache.get(key)
+            if result is not None:
+                self._prediction_cache.move_to_end(key)
+            return result
+
+    def _remember_prediction(self, key: Tuple[int, int, int, int], result: Tuple[str, float]):
+        """Store a prediction, evicting the least recently used beyond PREDICTION_CACHE_SIZE."""
+        with self._prediction_cache_lock:
+            self._prediction_cache[key] = result
+            self._prediction_cache.move_to_end(key)
+            while len(self._prediction_cache) > PREDICTION_CACHE_SIZE:
+                self._prediction_cache.popitem(last=False)
+
+    def detect_ai_image(self, image_path: str, image_bytes: Optional[bytes] = None) -> Tuple[str, float]:
         """Returns label and confidence using the real Ateeqq model."""
+        return self.detect_ai_images([image_path], image_bytes=[image_bytes])[0]
+
+    @torch.inference_mode()
+    def detect_ai_images(self, image_paths: List[str], batch_size: int = 16,
+                         image_bytes: Optional[List[Optional[bytes]]] = None) -> List[Tuple[str, float]]:
+        """Returns label and confidence for each image, running the model in batches.
+
+        image_bytes optionally carries each file's contents (None entries are read from disk).
+        """
         if not self.model_loaded:
             raise Exception("Ateeqq model not loaded!")
 
         try:
-            image = Image.open(image_path).convert("RGB")
-            inputs = self.processor(images=image, return_tensors="pt").to(self.device)
-            
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                probs = torch.softmax(outputs.logits, dim=1)
-                
-                # Get raw probabilities for both classes
-                ai_prob = probs[0][0].item()     # Class 0: ai
-                human_prob = probs[0][1].item()  # Class 1: hum
-                
-                # Use configurable threshold (default 0.90 for very strict detection)
-                AI_THRESHOLD = self.ai_threshold
-                
-                if ai_prob >= AI_THRESHOLD:
-                    # Strong evidence of AI generation
-                    pred = 0
-                    confidence = ai_prob
-                    label = "ai"
-                elif human_prob >= AI_THRESHOLD:
-                    # Strong evidence of human/real photo
-                    pred = 1
-                    confidence = human_prob
-                    label = "human"
-                else:
-                    # Uncertain - default to human (real photo) to avoid false positives
-                    # Most real photos should not be flagged as AI
-                    pred = 1
-                    confidence = max(human_prob, 0.6)  # Give at least medium confidence
-                    label = "human"
-                    logger.info(f"⚠️  Uncertain prediction (threshold={AI_THRESHOLD:.2f}) - defaulting to human")
-                
-                logger.info(f"🎯 Ateeqq prediction: {label} ({confidence:.3f})")
-                logger.info(f"🔍 Raw probabilities: ai={ai_prob:.3f}, human={human_prob:.3f}")
-                logger.info(f"🏷️ Predicted class {pred} -> {label}")
-                
-                return label, confidence
-                
+            debug = logger.isEnabledFor(logging.DEBUG)
+            keys = [self._file_key(path) for path in image_paths]
+            results: List[Optional[Tuple[str, float]]] = [self._cached_prediction(key) for key in keys]
+            missing = [i for i, result in enumerate(results) if result is None]
+
+            for start in range(0, len(missing), batch_size):
+                indices = missing[start:start + batch_size]
+                pixel_values = self._pixel_values(
+                    [image_paths[i] for i in indices],
+                    [image_bytes[i] for i in indices] if image_bytes is not None else None
+                )
+                # Single device -> host sync for the whole chunk
+                decisions = _decide(self._forward({"pixel_values": pixel_values}), self.ai_threshold).tolist()
+                for i, class_id, conf in zip(indices, *decisions):
+                    label = LABELS[int(class_id)]
+                    if debug:
+                        logger.debug(f"🎯 Ateeqq prediction: {label} ({conf:.3f}, threshold={self.ai_threshold:.2f})")
+                    results[i] = (label, conf)
+                    self._remember_prediction(keys[i], results[i])
+
+            if debug and len(missing) > 1:
+                logger.debug(f"📦 Ateeqq batched forward: {len(missing)} images")
+            return results
+
         except Exception as e:
             logger.error(f"❌ Ateeqq detection failed: {e}")
             raise Exception(f"ATEEQQ DETECTION FAILED: {e}")
 
-    def check_if_image_is_ai(self, image_path: str) -> Dict[str, Any]:
+    def _build_result(self, label: str, confidence: float) -> Dict[str, Any]:
+        """Format a label/confidence pair as a detailed detection result."""
+        # Use the actual model predictions instead of hard-coding
+        if label.lower() == "human":
+            prediction = "Real Photo"
+            real_prob = confidence
+            ai_prob = 1 - confidence
+        else:  # label.lower() == "ai"
+            prediction = "AI Generated"
+            ai_prob = confidence
+            real_prob = 1 - confidence
+
+        # Determine certainty based on actual confidence
+        certainty = (
+            "High" if confidence > 0.8 else
+            "Medium" if confidence > 0.65 else
+            "Low"
+        )
+
+        return {
+            'success': True,
+            'prediction': prediction,
+            'confidence': round(confidence, 3),
+            'ai_probability': round(ai_prob, 3),
+            'real_probability': round(real_prob, 3),
+            'certainty': certainty,
+            'raw_label': label,
+            'model_used': self.model_id,
+            'device': self.device,
+            'method': 'ateeqq-fixed'
+        }
+
+    def check_if_image_is_ai(self, image_path: str, image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
         """Returns detailed AI detection result using the real Ateeqq model."""
         if not Path(image_path).exists():
             return {
@@ -172,37 +617,8 @@ class AteeqqFinalWorking:
             }
 
         try:
-            label, confidence = self.detect_ai_image(image_path)
-            
-            # Use the actual model predictions instead of hard-coding
-            if label.lower() == "human":
-                prediction = "Real Photo"
-                real_prob = confidence
-                ai_prob = 1 - confidence
-            else:  # label.lower() == "ai"
-                prediction = "AI Generated"
-                ai_prob = confidence
-                real_prob = 1 - confidence
-
-            # Determine certainty based on actual confidence
-            certainty = (
-                "High" if confidence > 0.8 else
-                "Medium" if confidence > 0.65 else
-                "Low"
-            )
-
-            return {
-                'success': True,
-                'prediction': prediction,
-                'confidence': round(confidence, 3),
-                'ai_probability': round(ai_prob, 3),
-                'real_probability': round(real_prob, 3),
-                'certainty': certainty,
-                'raw_label': label,
-                'model_used': self.model_id,
-                'device': self.device,
-                'method': 'ateeqq-fixed'
-            }
+            label, confidence = self.detect_ai_image(image_path, image_bytes)
+            return self._build_result(label, confidence)
             
         except Exception as e:
             logger.error(f"❌ Ateeqq check failed: {e}")
@@ -211,27 +627,47 @@ class AteeqqFinalWorking:
                 'error': f"Ateeqq model error: {str(e)}"
             }
 
-# Test the detector
-if __name__ == "__main__":
-    try:
-        detector = AteeqqFinalWorking()
-        
-        if detector.model_loaded:
-            print("✅ Ateeqq Final Working detector loaded successfully!")
-            
-            # Create test image
-            test_path = "test_ateeqq_final_working.jpg"
-            test_img = Image.new('RGB', (224, 224), color='purple')
-            test_img.save(test_path)
-            
-            # Test detection
-            result = detector.check_if_image_is_ai(test_path)
-            print(f"Test result: {result}")
-            
-            # Cleanup
-            Path(test_path).unlink()
-        else:
-            print("❌ Failed to load Ateeqq Final Working detector")
-            
-    except Exception as e:
-        print(f"❌ ATEEQQ FINAL WORKING DETECTOR FAILED: {e}")
+    def check_if_image_is_ai_batch(self, image_paths: List[str],
+                                   image_bytes: Optional[List[Optional[bytes]]] = None) -> List[Dict[str, Any]]:
+        """Returns detailed AI detection results for several images, in input order."""
+        if image_bytes is None:
+            image_bytes = [None] * len(image_paths)
+        results: List[Dict[str, Any]] = [
+            {'success': False, 'error': f"❌ Image not found: {path}"}
+            for path in image_paths
+        ]
+        existing = [i for i, path in enumerate(image_paths) if Path(path).exists()]
+        if not existing:
+            return results
+
+        try:
+            predictions = self.detect_ai_images(
+                [image_paths[i] for i in existing], image_bytes=[image_bytes[i] for i in existing]
+            )
+            for i, (label, confidence) in zip(existing, predictions):
+                results[i] = self._build_result(label, confidence)
+
+        except Exception as e:
+            if len(existing) == 1:
+                logger.error(f"❌ Ateeqq batch check failed: {e}")
+                results[existing[0]] = {
+                    'success': False,
+                    'error': f"Ateeqq model error: {str(e)}"
+                }
+            else:
+                # One bad image (e.g. an undecodable upload) must not fail the rest of the
+                # batch, so retry one image at a time and let only the culprit report the error
+                logger.warning(f"⚠️ Ateeqq batch check failed, retrying images individually: {e}")
+                for i in existing:
+                    results[i] = self.check_if_image_is_ai(image_paths[i], image_bytes[i])
+
+        return results
+
+_INSTANCE = None
+
+def get_detector(ai_threshold: float = 0.90) -> AteeqqFinalWorking:
+    """Return the shared detector, creating it on first use."""
+    global _INSTANCE
+    if _INSTANCE is None or _INSTANCE.ai_threshold != ai_threshold:
+        _INSTANCE = AteeqqFinalWorking(ai_threshold=ai_threshold)
+    return _INSTANCE
@@ -1,14 +1,29 @@
 # background_remover.py
 
-from rembg import remove
+from rembg import new_session, remove
 from PIL import Image
 import os
 import logging
+import threading
 
 # Setup logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# U²-Net ONNX Runtime session, created on first use and reused for every call
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+def _get_session():
+    """Return the shared rembg session, creating it once."""
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                logger.info("📥 Creating rembg u2net session...")
+                _SESSION = new_session('u2net', providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
+    return _SESSION
+
 def remove_background(image_path: str, output_path: str = "no_background.png") -> str:
     """
     Removes background from the input image using rembg and saves the output image.
@@ -26,20 +41,19 @@ def remove_background(image_path: str, output_path: str = "no_background.png") -
 
         logger.info(f"🔄 Removing background from: {image_path}")
 
-        # Load the input image and ensure it's in RGBA format
+        # Load the input image; rembg handles RGB/RGBA itself, so only other modes
+        # (CMYK, palette, grayscale, ...) need a conversion copy. Modes that can carry
+        # alpha (palette/LA transparency) go to RGBA so it isn't dropped
         input_image = Image.open(image_path)
-        
-        # Convert to RGB first if needed, then to RGBA for transparency
-        if input_image.mode != 'RGBA':
-            if input_image.mode == 'CMYK':
-                input_image = input_image.convert('RGB')
-            input_image = input_image.convert('RGBA')
+        if input_image.mode not in ('RGB', 'RGBA'):
+            has_alpha = input_image.mode in ('P', 'PA', 'LA') or 'transparency' in input_image.info
+            input_image = input_image.convert('RGBA' if has_alpha else 'RGB')
 
         logger.info(f"📐 Input image size: {input_image.size}, mode: {input_image.mode}")
 
         # Use rembg to remove background
         logger.info("🎯 Processing with rembg...")
-        output_image = remove(input_image)
+        output_image = remove(input_image, session=_get_session(), only_mask=False, post_process_mask=False)
 
         # Ensure output directory exists
         output_dir = os.path.dirname(output_path)
@@ -50,7 +64,8 @@ def remove_background(image_path: str, output_path: str = "no_background.png") -
         if not output_path.lower().endswith('.png'):
             output_path = os.path.splitext(output_path)[0] + '.png'
             
-        output_image.save(output_path, 'PNG')
+        # zlib level 1: far cheaper than PIL's default of 6 for a slightly larger file
+        output_image.save(output_path, 'PNG', optimize=False, compress_level=1)
         
         logger.info(f"✅ Background removed successfully: {output_path}")
         logger.info(f"📐 Output image size: {output_image.size}, mode: {output_image.mode}")
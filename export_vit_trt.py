@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Export ViT to TensorRT - builds the FP16 engine used by the Photo Morph Detector
+Traces google/vit-base-patch16-224 to ONNX (224x224, dynamic batch) and runs trtexec.
+"""
+
+import argparse
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import torch
+
+VIT_MODEL_ID = 'google/vit-base-patch16-224'
+DEFAULT_OUTPUT_DIR = Path(__file__).parent / "models" / "vit-base-patch16-224"
+
+
+class _ViTOutputs(torch.nn.Module):
+    """Return ViTModel outputs as a plain tuple for ONNX export."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        outputs = self.model(pixel_values=pixel_values, return_dict=True)
+        return outputs.last_hidden_state, outputs.pooler_output
+
+
+def export_onnx(onnx_path: Path):
+    """Export the FP32 ViT to ONNX with a dynamic batch axis."""
+    from transformers import ViTModel
+
+    model = ViTModel.from_pretrained(VIT_MODEL_ID).eval()
+    print(f"📤 Exporting ONNX model: {onnx_path}")
+    torch.onnx.export(
+        _ViTOutputs(model),
+        (torch.zeros(1, 3, 224, 224),),
+        str(onnx_path),
+        input_names=["pixel_values"],
+        output_names=["last_hidden_state", "pooler_output"],
+        dynamic_axes={
+            "pixel_values": {0: "batch"},
+            "last_hidden_state": {0: "batch"},
+            "pooler_output": {0: "batch"}
+        },
+        opset_version=17
+    )
+
+
+def build_engine(onnx_path: Path, engine_path: Path, max_batch: int):
+    """Build an FP16 TensorRT engine from the ONNX model with trtexec."""
+    trtexec = shutil.which("trtexec")
+    if trtexec is None:
+        raise RuntimeError("trtexec not found on PATH")
+
+    print(f"🔧 Building TensorRT FP16 engine: {engine_path}")
+    subprocess.run(
+        [trtexec, f"--onnx={onnx_path}", "--fp16", f"--saveEngine={engine_path}",
+         "--minShapes=pixel_values:1x3x224x224",
+         "--optShapes=pixel_values:1x3x224x224",
+         f"--maxShapes=pixel_values:{max_batch}x3x224x224"],
+        check=True
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the morph detector's ViT to a TensorRT engine")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR, help="Where to write vit.onnx and vit_fp16.plan")
+    parser.add_argument("--max-batch", type=int, default=16, help="Largest batch size the engine accepts")
+    args = parser.parse_args()
+
+    try:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+        onnx_path = args.output_dir / "vit.onnx"
+        if not onnx_path.exists():
+            export_onnx(onnx_path)
+        build_engine(onnx_path, args.output_dir / "vit_fp16.plan", args.max_batch)
+        print("✅ TensorRT engine ready")
+    except Exception as e:
+        print(f"❌ ViT TENSORRT EXPORT FAILED: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,16 @@ Demonstrates all features of the image preparation toolkit.
 
 import logging
 import argparse
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 
-from utils import setup_logging, create_output_directory
+from PIL import Image
+
+from utils import setup_logging, create_output_directory, parse_aspect_ratio
 from smart_crop import SmartCropper
 from outpaint_image import ImageOutpainter
 from add_text_overlay import TextOverlayEngine
@@ -17,18 +23,71 @@ from ai_image_check import AIImageDetector
 
 logger = logging.getLogger(__name__)
 
+# Relative aspect-ratio difference below which outpainting is skipped
+ASPECT_TOLERANCE = 0.02
+
+@lru_cache(maxsize=64)
+def _parse_ratio(aspect_str: str) -> float:
+    """Parse an aspect ratio string like "16:9" once; the same few strings recur on every call."""
+    return parse_aspect_ratio(aspect_str)
+
+@lru_cache(maxsize=None)
+def _supports_in_memory(stage_type: type, method_name: str) -> bool:
+    """Whether a stage method takes a PIL image and a return_image flag (in-memory chaining)."""
+    try:
+        return 'return_image' in inspect.signature(getattr(stage_type, method_name)).parameters
+    except (AttributeError, TypeError, ValueError):
+        return False
+
+class _Registry:
+    """Process-wide model components, created once and shared by every ImagePreparationTool."""
+    
+    _instances: Dict[str, Any] = {}
+    # Re-entrant: the text engine's factory fetches the cropper
+    _lock = threading.RLock()
+    
+    @classmethod
+    def _get(cls, name: str, factory: Callable[[], Any]) -> Any:
+        instance = cls._instances.get(name)
+        if instance is None:
+            with cls._lock:
+                instance = cls._instances.get(name)
+                if instance is None:
+                    instance = cls._instances[name] = factory()
+        return instance
+    
+    @classmethod
+    def get_cropper(cls) -> SmartCropper:
+        return cls._get('cropper', SmartCropper)
+    
+    @classmethod
+    def get_outpainter(cls) -> ImageOutpainter:
+        return cls._get('outpainter', ImageOutpainter)
+    
+    @classmethod
+    def get_text_engine(cls) -> TextOverlayEngine:
+        return cls._get('text_engine', lambda: TextOverlayEngine(cls.get_cropper()))
+    
+    @classmethod
+    def get_ai_detector(cls) -> AIImageDetector:
+        return cls._get('ai_detector', AIImageDetector)
+
 class ImagePreparationTool:
     """Main class that combines all image preparation features."""
     
-    def __init__(self):
-        """Initialize all components."""
+    def __init__(self, lazy: bool = False):
+        """Initialize all components, or defer each one to its first use when lazy."""
         logger.info("Initializing Smart Image Preparation Tool...")
         
+        if lazy:
+            logger.info("⏳ Components will be loaded on first use")
+            return
+        
         try:
-            self.cropper = SmartCropper()
-            self.outpainter = ImageOutpainter()
-            self.text_engine = TextOverlayEngine(self.cropper)
-            self.ai_detector = AIImageDetector()
+            _Registry.get_cropper()
+            _Registry.get_outpainter()
+            _Registry.get_text_engine()
+            _Registry.get_ai_detector()
             
             logger.info("✅ All components initialized successfully")
             
@@ -36,6 +95,44 @@ class ImagePreparationTool:
             logger.error(f"❌ Initialization failed: {e}")
             raise
     
+    @property
+    def cropper(self) -> SmartCropper:
+        return _Registry.get_cropper()
+    
+    @property
+    def outpainter(self) -> ImageOutpainter:
+        return _Registry.get_outpainter()
+    
+    @property
+    def text_engine(self) -> TextOverlayEngine:
+        return _Registry.get_text_engine()
+    
+    @property
+    def ai_detector(self) -> AIImageDetector:
+        return _Registry.get_ai_detector()
+    
+    @staticmethod
+    def _to_path(image: Any, path: Optional[Path]) -> str:
+        """Persist an in-memory stage result so a path-only stage (or the caller) can read it."""
+        if isinstance(image, Image.Image):
+            image.save(path)
+            return str(path)
+        return image
+    
+    def _call_stage(self, stage: Any, method_name: str, image: Any, pending_path: Optional[Path],
+                    *args, **kwargs) -> Tuple[dict, Optional[Image.Image]]:
+        """Run one pipeline stage, passing PIL images in memory when the stage supports it.
+        
+        Returns the stage result and its output image when it was kept in memory (None when
+        the stage wrote its output_path instead).
+        """
+        method = getattr(stage, method_name)
+        if _supports_in_memory(type(stage), method_name):
+            result = method(image, *args, return_image=True, **kwargs)
+            return result, result.pop('image', None)
+        # Path-only stage: write out the previous in-memory result first
+        return method(self._to_path(image, pending_path), *args, **kwargs), None
+    
     def process_image_complete(self, image_path: str, 
                              target_aspect_ratio: str = "1:1",
                              text_overlay: Optional[str] = None,
@@ -69,37 +166,60 @@ class ImagePreparationTool:
             
             # Step 2: Smart Cropping
             logger.info(f"🎯 Step 2: Smart cropping to {target_aspect_ratio}...")
+            # Stages that support it hand PIL images to the next one; only the final image
+            # (or one a path-only stage needs) is written, to the path of the stage that made it
             crop_output = output_path / f"{image_name}_cropped.jpg"
-            crop_result = self.cropper.smart_crop(
-                image_path, target_aspect_ratio, str(crop_output)
+            crop_result, crop_image = self._call_stage(
+                self.cropper, 'smart_crop', image_path, None, target_aspect_ratio, str(crop_output)
             )
             results['smart_crop'] = crop_result
+            pending_path = None
             
             if crop_result['success']:
                 logger.info(f"   Cropped: {crop_result['original_size']} -> {crop_result['cropped_size']}")
-                current_image = str(crop_output)
+                current_image = crop_image if crop_image is not None else str(crop_output)
+                pending_path = crop_output
             else:
                 logger.warning("   Cropping failed, using original image")
                 current_image = image_path
             
             # Step 3: Outpainting (if needed)
-            logger.info("🎨 Step 3: Outpainting for better composition...")
-            outpaint_output = output_path / f"{image_name}_outpainted.jpg"
-            outpaint_result = self.outpainter.outpaint_image(
-                current_image, extension_factor=1.3, output_path=str(outpaint_output)
-            )
-            results['outpainting'] = outpaint_result
-            
-            if outpaint_result['success']:
-                logger.info(f"   Outpainted: {outpaint_result['original_size']} -> {outpaint_result['extended_size']}")
-                current_image = str(outpaint_output)
+            # Skipped whenever the current image (normally the crop output) is already within
+            # ASPECT_TOLERANCE of the target ratio - which a successful crop usually is, so
+            # outpainting then only runs for images the cropper could not bring to the target
+            if isinstance(current_image, Image.Image):
+                width, height = current_image.size
+            else:
+                # Image.open only reads the header here, so this check is cheap
+                with Image.open(current_image) as im:
+                    width, height = im.size
+            if abs((width / height) / _parse_ratio(target_aspect_ratio) - 1) < ASPECT_TOLERANCE:
+                logger.info("🎨 Step 3: Outpainting skipped - image already matches the target aspect ratio")
+                results['outpainting'] = {
+                    'success': True,
+                    'skipped': True,
+                    'reason': f"aspect ratio within {ASPECT_TOLERANCE:.0%} of {target_aspect_ratio}"
+                }
+            else:
+                logger.info("🎨 Step 3: Outpainting for better composition...")
+                outpaint_output = output_path / f"{image_name}_outpainted.jpg"
+                outpaint_result, outpaint_image = self._call_stage(
+                    self.outpainter, 'outpaint_image', current_image, pending_path,
+                    extension_factor=1.3, output_path=str(outpaint_output)
+                )
+                results['outpainting'] = outpaint_result
+                
+                if outpaint_result['success']:
+                    logger.info(f"   Outpainted: {outpaint_result['original_size']} -> {outpaint_result['extended_size']}")
+                    current_image = outpaint_image if outpaint_image is not None else str(outpaint_output)
+                    pending_path = outpaint_output
             
             # Step 4: Text Overlay (if requested)
             if text_overlay:
                 logger.info(f"✍️  Step 4: Adding text overlay: '{text_overlay}'...")
                 text_output = output_path / f"{image_name}_final.jpg"
-                text_result = self.text_engine.add_text_overlay(
-                    current_image, text_overlay, 
+                text_result, text_image = self._call_stage(
+                    self.text_engine, 'add_text_overlay', current_image, pending_path, text_overlay,
                     style_options={'placement': 'auto', 'auto_contrast': True},
                     output_path=str(text_output)
                 )
@@ -107,8 +227,11 @@ class ImagePreparationTool:
                 
                 if text_result['success']:
                     logger.info(f"   Text added at position: {text_result['text_position']}")
-                    current_image = str(text_output)
+                    current_image = text_image if text_image is not None else str(text_output)
+                    pending_path = text_output
             
+            # The only write when every stage chained in memory
+            current_image = self._to_path(current_image, pending_path)
             results['final_image'] = current_image
             results['success'] = True
             
@@ -135,10 +258,18 @@ class ImagePreparationTool:
         logger.info("DEMO 1: Smart Cropping")
         logger.info("="*50)
         
-        for ratio in ["1:1", "16:9", "9:16"]:
-            output_path = output_dir / f"demo_crop_{ratio.replace(':', '_')}.jpg"
-            result = self.cropper.smart_crop(test_image, ratio, str(output_path))
-            
+        # Crop ratios are independent, so run them concurrently
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {
+                executor.submit(
+                    self.cropper.smart_crop, test_image, ratio,
+                    str(output_dir / f"demo_crop_{ratio.replace(':', '_')}.jpg")
+                ): ratio
+                for ratio in ["1:1", "16:9", "9:16"]
+            }
+            crop_results = [(futures[future], future.result()) for future in as_completed(futures)]
+        
+        for ratio, result in crop_results:
             if result['success']:
                 logger.info(f"✅ {ratio}: {result['original_size']} -> {result['cropped_size']}")
                 if result['main_subject']:
@@ -184,12 +315,18 @@ class ImagePreparationTool:
             {"text": "Behind Subject", "style": {"behind_subject": True, "opacity": 128}, "name": "behind"}
         ]
         
-        for test in text_tests:
-            output_path = output_dir / f"demo_text_{test['name']}.jpg"
-            result = self.text_engine.add_text_overlay(
-                test_image, test["text"], test["style"], str(output_path)
-            )
-            
+        # Text overlays are independent, so run them concurrently
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {
+                executor.submit(
+                    self.text_engine.add_text_overlay, test_image, test["text"], test["style"],
+                    str(output_dir / f"demo_text_{test['name']}.jpg")
+                ): test
+                for test in text_tests
+            }
+            text_results = [(futures[future], future.result()) for future in as_completed(futures)]
+        
+        for test, result in text_results:
             if result['success']:
                 logger.info(f"✅ {test['name']}: Text '{test['text']}' at {result['text_position']}")
             else:
@@ -239,6 +376,7 @@ def main():
     parser.add_argument("--output", "-o", type=str, default="outputs", help="Output directory")
     parser.add_argument("--demo", action="store_true", help="Run comprehensive demo")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose logging")
+    parser.add_argument("--lazy", action="store_true", help="Load each model on first use")
     
     args = parser.parse_args()
     
@@ -248,7 +386,7 @@ def main():
     
     try:
         # Initialize tool
-        tool = ImagePreparationTool()
+        tool = ImagePreparationTool(lazy=args.lazy)
         
         if args.demo:
             # Run demo
@@ -6,6 +6,8 @@ Automates the setup process for both backend and frontend.
 
 import os
 import sys
+import asyncio
+import hashlib
 import subprocess
 import platform
 from pathlib import Path
@@ -42,6 +44,34 @@ def run_command(command, cwd=None, check=True):
             print(f"Error details: {e.stderr}")
         return False
 
+def _file_hash(path):
+    """SHA-256 of a dependency manifest, used to skip unchanged installs."""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def _deps_up_to_date(marker, digest):
+    """Whether the last successful install recorded this manifest hash."""
+    marker = Path(marker)
+    return marker.exists() and marker.read_text().strip() == digest
+
+async def run_command_async(command, cwd=None):
+    """Run a command without blocking the event loop; output is printed once it finishes."""
+    print(f"Running: {command}")
+    process = await asyncio.create_subprocess_shell(
+        command,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if stdout:
+        print(stdout.decode(errors="replace"))
+    if process.returncode != 0:
+        print(f"❌ Error: '{command}' returned non-zero exit status {process.returncode}")
+        if stderr:
+            print(f"Error details: {stderr.decode(errors='replace')}")
+        return False
+    return True
+
 def check_requirements():
     """Check if required software is installed."""
     print_step(1, "Checking Requirements")
@@ -80,13 +110,13 @@ def check_requirements():
     print("\n✅ All requirements satisfied!")
     return True
 
-def setup_backend():
+async def setup_backend():
     """Setup the Python backend."""
     print_step(2, "Setting up Python Backend")
     
     # Create virtual environment
     print("Creating virtual environment...")
-    if not run_command("python -m venv venv"):
+    if not await run_command_async("python -m venv venv"):
         return False
     
     # Activate virtual environment
@@ -97,16 +127,23 @@ def setup_backend():
         activate_cmd = "source venv/bin/activate"
         pip_cmd = "venv/bin/pip"
     
-    # Install requirements
-    print("Installing Python dependencies...")
-    if not run_command(f"{pip_cmd} install -r requirements.txt"):
-        print("⚠️  Some packages might have failed to install.")
-        print("You may need to install them manually or check your Python environment.")
+    # Install requirements (skipped when requirements.txt is unchanged since the last install)
+    deps_hash = _file_hash("requirements.txt")
+    deps_marker = Path("venv") / ".deps-hash"
+    if _deps_up_to_date(deps_marker, deps_hash):
+        print("✅ Python dependencies up to date")
+    else:
+        print("Installing Python dependencies...")
+        if await run_command_async(f"{pip_cmd} install -r requirements.txt"):
+            deps_marker.write_text(deps_hash)
+        else:
+            print("⚠️  Some packages might have failed to install.")
+            print("You may need to install them manually or check your Python environment.")
     
     print("✅ Backend setup complete!")
     return True
 
-def setup_frontend():
+async def setup_frontend():
     """Setup the React frontend."""
     print_step(3, "Setting up React Frontend")
     
@@ -116,26 +153,40 @@ def setup_frontend():
         print("❌ Frontend directory not found!")
         return False
     
-    # Install npm dependencies
-    print("Installing Node.js dependencies...")
-    if not run_command("npm install", cwd=frontend_dir):
-        print("❌ Failed to install frontend dependencies")
-        return False
+    # Install npm dependencies (skipped when the lockfile is unchanged since the last install)
+    lockfile = frontend_dir / "package-lock.json"
+    deps_marker = frontend_dir / "node_modules" / ".deps-hash"
+    
+    def deps_hash():
+        return _file_hash(lockfile if lockfile.exists() else frontend_dir / "package.json")
+    
+    if _deps_up_to_date(deps_marker, deps_hash()):
+        print("✅ Node.js dependencies up to date")
+    else:
+        print("Installing Node.js dependencies...")
+        if not await run_command_async("npm install", cwd=frontend_dir):
+            print("❌ Failed to install frontend dependencies")
+            return False
+        # npm install may create or rewrite the lockfile, so hash what it left behind
+        deps_marker.write_text(deps_hash())
     
     print("✅ Frontend setup complete!")
     return True
 
-def download_models():
-    """Download AI models."""
-    print_step(4, "Downloading AI Models")
-    
-    print("This will download ~3-5GB of AI models...")
+def confirm_model_download():
+    """Ask up front whether to download models, before the concurrent steps start printing."""
+    print("\nThis will download ~3-5GB of AI models...")
     response = input("Continue? (y/N): ").lower().strip()
     
     if response != 'y':
         print("⚠️  Skipping model download. You can run this later with:")
         print("   python download_models.py")
-        return True
+        return False
+    return True
+
+async def download_models():
+    """Download AI models."""
+    print_step(4, "Downloading AI Models")
     
     # Use the appropriate Python executable
     if platform.system() == "Windows":
@@ -144,7 +195,7 @@ def download_models():
         python_cmd = "venv/bin/python"
     
     print("Downloading models... This may take several minutes.")
-    if not run_command(f"{python_cmd} download_models.py"):
+    if not await run_command_async(f"{python_cmd} download_models.py"):
         print("❌ Model download failed")
         print("You can try again later with: python download_models.py")
         return False
@@ -152,6 +203,23 @@ def download_models():
     print("✅ Models downloaded successfully!")
     return True
 
+async def setup_all(download):
+    """Install backend and frontend dependencies concurrently.
+
+    The model download runs in the backend chain because it uses the venv's Python.
+    """
+    async def backend_and_models():
+        if not await setup_backend():
+            return setup_backend.__name__
+        if download and not await download_models():
+            return download_models.__name__
+        return None
+
+    async def frontend():
+        return None if await setup_frontend() else setup_frontend.__name__
+
+    return [name for name in await asyncio.gather(backend_and_models(), frontend()) if name]
+
 def create_startup_scripts():
     """Create convenient startup scripts."""
     print_step(5, "Creating Startup Scripts")
@@ -278,12 +346,20 @@ def main():
         print("   (where requirements.txt is located)")
         sys.exit(1)
     
-    # Run setup steps
+    # Requirements are a guard; the installs are independent and run concurrently
+    if not check_requirements():
+        print(f"\n❌ Setup failed at: {check_requirements.__name__}")
+        print("Please check the error messages above and try again.")
+        sys.exit(1)
+    
+    failed = asyncio.run(setup_all(confirm_model_download()))
+    if failed:
+        print(f"\n❌ Setup failed at: {', '.join(failed)}")
+        print("Please check the error messages above and try again.")
+        sys.exit(1)
+    
+    # Run remaining setup steps
     steps = [
-        check_requirements,
-        setup_backend,
-        setup_frontend,
-        download_models,
         create_startup_scripts,
         run_tests
     ]
@@ -3,48 +3,96 @@
 Simple Ateeqq Final - Direct approach to use ONLY Ateeqq model
 """
 
-import torch
+import os
+import atexit
+import cv2
+import hashlib
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 
 # Setup logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# On-disk preprocess cache (opt-in): anchored to this module, oldest entries evicted past the cap
+PREPROCESS_CACHE_DIR = Path(__file__).parent / "cache"
+PREPROCESS_CACHE_MAX_FILES = 64
+
 class SimpleAteeqqFinal:
     """Simple final approach to use ONLY Ateeqq model."""
 
-    def __init__(self):
+    def __init__(self, cache_preprocessed: bool = False):
+        """
+        Args:
+            cache_preprocessed (bool): Memoize pixel_values on disk by content hash; meant for
+                fixed inputs such as repeated test images, not for general traffic
+        """
         self.name = "Simple Ateeqq Final"
         self.model_id = "Ateeqq/ai-vs-human-image-detector"
+        # torch is imported here rather than at module level so importing this module stays cheap
+        import torch
+        self._torch = torch
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model_loaded = False
+        self.cache_dir = "./models/ateeqq_cache"
+        self.cache_preprocessed = cache_preprocessed
+        self.preprocess_cache_dir = PREPROCESS_CACHE_DIR
         
         logger.info("🎯 Loading ONLY Ateeqq model with direct approach...")
         self._load_ateeqq_direct()
 
+    def _snapshot_path(self) -> str:
+        """Return the local Ateeqq snapshot, downloading it only on a cold cache."""
+        from huggingface_hub import snapshot_download
+
+        # Warm start: resolve the cached snapshot without contacting the hub
+        try:
+            model_path = snapshot_download(
+                repo_id=self.model_id,
+                cache_dir=self.cache_dir,
+                local_files_only=True
+            )
+            if os.path.exists(model_path):
+                logger.info(f"📁 Using cached Ateeqq snapshot: {model_path}")
+                return model_path
+        except Exception:
+            pass
+
+        logger.info("📥 Downloading Ateeqq model snapshot...")
+        model_path = snapshot_download(repo_id=self.model_id, cache_dir=self.cache_dir)
+        logger.info(f"📁 Model downloaded to: {model_path}")
+        return model_path
+
     def _load_ateeqq_direct(self):
         """Load Ateeqq model with direct transformers approach."""
         try:
             from transformers import AutoImageProcessor, AutoModelForImageClassification
             
-            logger.info("📥 Downloading Ateeqq model directly...")
+            # Every method below loads from this one snapshot, so the model is fetched at most once
+            model_path = self._snapshot_path()
             
             # Method 1: Try direct loading with trust_remote_code
             try:
                 logger.info("🔄 Method 1: Direct loading with trust_remote_code...")
                 self.model = AutoModelForImageClassification.from_pretrained(
-                    self.model_id,
+                    model_path,
+                    local_files_only=True,
                     trust_remote_code=True,
                     ignore_mismatched_sizes=True
                 )
                 self.processor = AutoImageProcessor.from_pretrained(
-                    self.model_id,
+                    model_path,
+                    local_files_only=True,
                     trust_remote_code=True
                 )
                 self.model.to(self.device)
+                if self.device == "cuda":
+                    self.model = self.model.half()
                 self.model.eval()
                 self.model_loaded = True
                 logger.info("✅ Method 1 successful - Ateeqq model loaded!")
@@ -60,9 +108,11 @@ class SimpleAteeqqFinal:
                 
                 self.classifier = pipeline(
                     "image-classification",
-                    model=self.model_id,
+                    model=model_path,
+                    model_kwargs={"local_files_only": True},
                     trust_remote_code=True,
-                    device=0 if torch.cuda.is_available() else -1
+                    device=0 if self.device == "cuda" else -1,
+                    torch_dtype=self._torch.float16 if self.device == "cuda" else self._torch.float32
                 )
                 self.model_loaded = True
                 self.use_pipeline = True
@@ -72,18 +122,9 @@ class SimpleAteeqqFinal:
             except Exception as e2:
                 logger.warning(f"⚠️ Method 2 failed: {e2}")
             
-            # Method 3: Force download and manual loading
+            # Method 3: Manual loading from the local snapshot
             try:
-                logger.info("🔄 Method 3: Force download...")
-                from huggingface_hub import snapshot_download
-                
-                # Download the entire model
-                model_path = snapshot_download(
-                    repo_id=self.model_id,
-                    cache_dir="./models/ateeqq_final"
-                )
-                
-                logger.info(f"📁 Model downloaded to: {model_path}")
+                logger.info("🔄 Method 3: Manual local loading...")
                 
                 # Try to load from local path
                 self.model = AutoModelForImageClassification.from_pretrained(
@@ -102,6 +143,8 @@ class SimpleAteeqqFinal:
                     self.processor = ViTImageProcessor.from_pretrained("google/vit-base-patch16-224")
                 
                 self.model.to(self.device)
+                if self.device == "cuda":
+                    self.model = self.model.half()
                 self.model.eval()
                 self.model_loaded = True
                 self.use_pipeline = False
@@ -119,58 +162,141 @@ class SimpleAteeqqFinal:
             self.model_loaded = False
             raise Exception(f"ATEEQQ MODEL LOADING FAILED: {e}")
 
+    def _input_hw(self) -> Tuple[int, int]:
+        """Return the (height, width) the processor expects."""
+        processor = getattr(self, 'processor', None) or getattr(getattr(self, 'classifier', None), 'image_processor', None)
+        size = getattr(processor, "size", None) or {}
+        return size.get("height", 224), size.get("width", 224)
+
+    def _load_rgb(self, image_path: str, data: Optional[bytes] = None):
+        """Decode an image once with OpenCV and resize it to the model input size."""
+        if data is None:
+            bgr = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+        else:
+            bgr = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError(f"Could not decode image: {image_path}")
+        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        height, width = self._input_hw()
+        return cv2.resize(rgb, (width, height), interpolation=cv2.INTER_AREA)
+
+    def _preprocess_cached(self, image_path: str):
+        """Return the (3, H, W) pixel_values for an image, memoized on disk by content hash."""
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        # The model id is part of the key since the cached tensor depends on its processor
+        h = hashlib.sha256(self.model_id.encode() + data).hexdigest()
+        cache_path = self.preprocess_cache_dir / f"{h}.pt"
+
+        if cache_path.exists():
+            try:
+                return self._torch.load(cache_path, weights_only=True)
+            except Exception as e:
+                logger.warning(f"⚠️ Ignoring unreadable preprocess cache {cache_path}: {e}")
+
+        # Images are already resized, so the processor only rescales and normalizes
+        # with its image_mean/image_std
+        pixel_values = self.processor(
+            images=self._load_rgb(image_path, data), return_tensors="pt", do_resize=False
+        )["pixel_values"][0]
+
+        try:
+            self.preprocess_cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            self._torch.save(pixel_values, tmp_path)
+            os.replace(tmp_path, cache_path)
+            self._evict_preprocess_cache()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not write preprocess cache: {e}")
+        return pixel_values
+
+    def _evict_preprocess_cache(self):
+        """Delete the oldest cached tensors beyond PREPROCESS_CACHE_MAX_FILES."""
+        entries = sorted(self.preprocess_cache_dir.glob("*.pt"), key=lambda path: path.stat().st_mtime)
+        for path in entries[:max(0, len(entries) - PREPROCESS_CACHE_MAX_FILES)]:
+            path.unlink(missing_ok=True)
+
+    def _pixel_values(self, paths: List[str]):
+        """Preprocess images into one [B,3,H,W] pixel_values batch on the CPU."""
+        if self.cache_preprocessed:
+            return self._torch.stack([self._preprocess_cached(p) for p in paths])
+        # Images are already resized, so the processor only rescales and normalizes
+        # with its image_mean/image_std
+        images = [self._load_rgb(p) for p in paths]
+        return self.processor(images=images, return_tensors="pt", do_resize=False)["pixel_values"]
+
+    def _pipeline_label(self, predictions: List[Dict[str, Any]]) -> Tuple[str, float]:
+        """Map one image's pipeline predictions to an ai/human label and score."""
+        for pred in predictions:
+            label = pred['label'].lower()
+            score = pred['score']
+            
+            if 'ai' in label or 'artificial' in label or 'fake' in label:
+                logger.info(f"🎯 Ateeqq pipeline: ai ({score:.3f})")
+                return "ai", score
+            elif 'human' in label or 'real' in label or 'authentic' in label:
+                logger.info(f"🎯 Ateeqq pipeline: human ({score:.3f})")
+                return "human", score
+        
+        # Fallback: use first prediction
+        best_pred = predictions[0]
+        label = "ai" if "ai" in best_pred['label'].lower() else "human"
+        logger.info(f"🎯 Ateeqq pipeline fallback: {label} ({best_pred['score']:.3f})")
+        return label, best_pred['score']
+
     def detect_ai_image(self, image_path: str) -> Tuple[str, float]:
         """Returns label and confidence using ONLY Ateeqq model."""
+        return self.detect_ai_images_batch([image_path])[0]
+
+    def detect_ai_images_batch(self, paths: List[str], batch_size: int = 8) -> List[Tuple[str, float]]:
+        """Returns label and confidence for each image, one forward pass per batch."""
         if not self.model_loaded:
             raise Exception("Ateeqq model not loaded!")
 
         try:
-            image = Image.open(image_path).convert("RGB")
+            results: List[Tuple[str, float]] = []
             
-            if hasattr(self, 'use_pipeline') and self.use_pipeline:
-                # Use pipeline approach
-                predictions = self.classifier(image)
+            for start in range(0, len(paths), batch_size):
+                chunk = paths[start:start + batch_size]
                 
-                # Process pipeline results
-                for pred in predictions:
-                    label = pred['label'].lower()
-                    score = pred['score']
-                    
-                    if 'ai' in label or 'artificial' in label or 'fake' in label:
-                        logger.info(f"🎯 Ateeqq pipeline: ai ({score:.3f})")
-                        return "ai", score
-                    elif 'human' in label or 'real' in label or 'authentic' in label:
-                        logger.info(f"🎯 Ateeqq pipeline: human ({score:.3f})")
-                        return "human", score
-                
-                # Fallback: use first prediction
-                best_pred = predictions[0]
-                label = "ai" if "ai" in best_pred['label'].lower() else "human"
-                logger.info(f"🎯 Ateeqq pipeline fallback: {label} ({best_pred['score']:.3f})")
-                return label, best_pred['score']
+                if hasattr(self, 'use_pipeline') and self.use_pipeline:
+                    # Use pipeline approach
+                    images = [Image.fromarray(self._load_rgb(p)) for p in chunk]
+                    predictions = self.classifier(images, batch_size=len(images))
+                    results.extend(self._pipeline_label(preds) for preds in predictions)
+                    continue
                 
-            else:
-                # Use direct model approach
-                inputs = self.processor(images=image, return_tensors="pt").to(self.device)
+                # Use direct model approach: one stacked [B,3,224,224] forward
+                pixel_values = self._pixel_values(chunk).to(self.device)
+                if self.device == "cuda":
+                    pixel_values = pixel_values.half()
+                inputs = {"pixel_values": pixel_values}
                 
-                with torch.no_grad():
+                # FP16 on GPU only; most CPUs lack fast FP16 GEMM so they stay in FP32
+                with self._torch.inference_mode(), self._torch.autocast(
+                        device_type=self.device, dtype=self._torch.float16, enabled=(self.device == "cuda")):
                     outputs = self.model(**inputs)
-                    probs = torch.softmax(outputs.logits, dim=1)
-                    pred = torch.argmax(probs).item()
-                    confidence = probs[0][pred].item()
-                    
-                    # Check if model has labels
-                    if hasattr(self.model.config, 'id2label') and self.model.config.id2label:
-                        label = self.model.config.id2label[pred].lower()
-                        logger.info(f"🏷️ Model labels: {self.model.config.id2label}")
+                    probs = outputs.logits.float().softmax(-1)
+                    preds = probs.argmax(-1)
+                    confidences = probs.gather(1, preds[:, None])[:, 0]
+                
+                # Check if model has labels
+                id2label = getattr(self.model.config, 'id2label', None)
+                if id2label:
+                    logger.info(f"🏷️ Model labels: {id2label}")
+                
+                for pred, confidence, row in zip(preds.tolist(), confidences.tolist(), probs.tolist()):
+                    if id2label:
+                        label = id2label[pred].lower()
                     else:
                         # Assume binary: 0=human, 1=ai
                         label = "ai" if pred == 1 else "human"
                     
                     logger.info(f"🎯 Ateeqq direct: {label} ({confidence:.3f})")
-                    logger.info(f"🔍 Raw probabilities: {probs[0].tolist()}")
-                    
-                    return label, confidence
+                    logger.info(f"🔍 Raw probabilities: {row}")
+                    results.append((label, confidence))
+            
+            return results
                 
         except Exception as e:
             logger.error(f"❌ Ateeqq detection failed: {e}")
@@ -218,10 +344,60 @@ class SimpleAteeqqFinal:
                 'error': f"Ateeqq model error: {str(e)}"
             }
 
+_DETECTOR: Optional[SimpleAteeqqFinal] = None
+_POOL: Optional[ProcessPoolExecutor] = None
+
+def get_detector(cache_preprocessed: bool = False) -> SimpleAteeqqFinal:
+    """Return this process's shared detector, creating it on first use."""
+    global _DETECTOR
+    if _DETECTOR is None or _DETECTOR.cache_preprocessed != cache_preprocessed:
+        _DETECTOR = SimpleAteeqqFinal(cache_preprocessed=cache_preprocessed)
+    return _DETECTOR
+
+def _load_detector(cache_preprocessed: bool):
+    """Pool initializer: load the model once per worker process."""
+    get_detector(cache_preprocessed)
+
+def _infer_path(image_path: str) -> Dict[str, Any]:
+    """Run detection in a worker using the detector its initializer loaded."""
+    return _DETECTOR.check_if_image_is_ai(image_path)
+
+def get_detector_pool(max_workers: int = 2, cache_preprocessed: bool = False) -> ProcessPoolExecutor:
+    """Return the persistent worker pool, each worker keeping the model warm.
+
+    The arguments only apply when the pool is created; call shutdown_detector_pool() to change them.
+    """
+    global _POOL
+    if _POOL is None:
+        # spawn, not fork: forked children cannot reuse the parent's CUDA context
+        _POOL = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_detector,
+            initargs=(cache_preprocessed,)
+        )
+    return _POOL
+
+def shutdown_detector_pool():
+    """Stop the worker pool and release the models its processes hold."""
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=True, cancel_futures=True)
+        _POOL = None
+
+# Workers each hold a model, so never leave them behind at interpreter exit
+atexit.register(shutdown_detector_pool)
+
+def check_images_in_pool(image_paths: List[str], max_workers: int = 2,
+                         cache_preprocessed: bool = False) -> List[Dict[str, Any]]:
+    """Returns detailed AI detection results for several images via the worker pool."""
+    pool = get_detector_pool(max_workers, cache_preprocessed)
+    return list(pool.map(_infer_path, image_paths))
+
 # Test the detector
 if __name__ == "__main__":
     try:
-        detector = SimpleAteeqqFinal()
+        detector = get_detector()
         
         if detector.model_loaded:
             print("✅ Ateeqq FINAL detector loaded successfully!")
@@ -3,61 +3,17 @@
 Test script to verify AI detection is working correctly
 """
 
-from ateeqq_final_working import AteeqqFinalWorking
+from ateeqq_final_working import get_detector
+from simple_ateeqq_final import check_images_in_pool, shutdown_detector_pool
 from PIL import Image
+import numpy as np
 import os
 
-print("="*60)
-print("TESTING AI DETECTION FIX")
-print("="*60)
-
-# Create test detector
-print("\n1. Initializing AI Detector...")
-detector = AteeqqFinalWorking()
-
-if not detector.model_loaded:
-    print("❌ FAILED: Model not loaded!")
-    exit(1)
-
-print("✅ Model loaded successfully")
-print(f"   Model ID: {detector.model_id}")
-print(f"   Device: {detector.device}")
-
-# Create test images
-print("\n2. Creating test images...")
-
-# Test 1: Simple solid color (should be real/human)
-test1 = "test_simple.jpg"
-img1 = Image.new('RGB', (224, 224), color='red')
-img1.save(test1)
-print(f"   Created {test1}")
 
-# Test 2: Random noise (might be detected as AI)
-import numpy as np
-test2 = "test_noise.jpg"
-noise = np.random.randint(0, 255, (224, 224, 3), dtype=np.uint8)
-img2 = Image.fromarray(noise)
-img2.save(test2)
-print(f"   Created {test2}")
-
-# Test 3: Gradient (might be detected as AI)
-test3 = "test_gradient.jpg"
-gradient = np.zeros((224, 224, 3), dtype=np.uint8)
-for i in range(224):
-    gradient[i, :, :] = int(i * 255 / 224)
-img3 = Image.fromarray(gradient)
-img3.save(test3)
-print(f"   Created {test3}")
-
-# Run tests
-print("\n3. Running AI Detection Tests...")
-print("-"*60)
-
-test_images = [test1, test2, test3]
-for test_img in test_images:
+def print_result(test_img, result):
+    """Print one detection result."""
     print(f"\nTesting: {test_img}")
-    result = detector.check_if_image_is_ai(test_img)
-    
+
     if result['success']:
         print(f"  ✅ Prediction: {result['prediction']}")
         print(f"     Confidence: {result['confidence']:.3f}")
@@ -67,20 +23,91 @@ for test_img in test_images:
     else:
         print(f"  ❌ Detection failed: {result.get('error', 'Unknown error')}")
 
-# Cleanup
-print("\n4. Cleaning up test images...")
-for test_img in test_images:
-    if os.path.exists(test_img):
-        os.remove(test_img)
-        print(f"   Removed {test_img}")
-
-print("\n" + "="*60)
-print("TEST COMPLETE")
-print("="*60)
-print("\n✅ AI Detection is working correctly!")
-print("   The model is making real predictions based on image content.")
-print("\n📝 Next steps:")
-print("   1. Stop the backend server if it's running (Ctrl+C)")
-print("   2. Restart the backend: python api_server_simple.py")
-print("   3. The frontend will now get real AI detection results!")
-print("="*60)
+
+def main():
+    print("="*60)
+    print("TESTING AI DETECTION FIX")
+    print("="*60)
+
+    # Create test detector
+    print("\n1. Initializing AI Detector...")
+    detector = get_detector()
+
+    if not detector.model_loaded:
+        print("❌ FAILED: Model not loaded!")
+        exit(1)
+
+    print("✅ Model loaded successfully")
+    print(f"   Model ID: {detector.model_id}")
+    print(f"   Device: {detector.device}")
+
+    # Create test images
+    print("\n2. Creating test images...")
+
+    # Test 1: Simple solid color (should be real/human)
+    test1 = "test_simple.jpg"
+    img1 = Image.new('RGB', (224, 224), color='red')
+    img1.save(test1)
+    print(f"   Created {test1}")
+
+    # Test 2: Random noise (might be detected as AI)
+    test2 = "test_noise.jpg"
+    np.random.seed(0)  # Fixed seed keeps the image bytes, and its preprocess cache key, stable
+    noise = np.random.randint(0, 255, (224, 224, 3), dtype=np.uint8)
+    img2 = Image.fromarray(noise)
+    img2.save(test2)
+    print(f"   Created {test2}")
+
+    # Test 3: Gradient (might be detected as AI)
+    test3 = "test_gradient.jpg"
+    rows = (np.arange(224) * 255 // 224).astype(np.uint8)[:, None, None]
+    gradient = np.broadcast_to(rows, (224, 224, 3)).copy()
+    img3 = Image.fromarray(gradient)
+    img3.save(test3)
+    print(f"   Created {test3}")
+
+    test_images = [test1, test2, test3]
+    try:
+        # Run tests
+        print("\n3. Running AI Detection Tests...")
+        print("-"*60)
+
+        results = detector.check_if_image_is_ai_batch(test_images)
+        for test_img, result in zip(test_images, results):
+            print_result(test_img, result)
+
+        # The same images through the warm SimpleAteeqqFinal worker; the images are
+        # deterministic, so repeated runs reuse their cached preprocessing
+        print("\n4. Cross-checking with the Simple Ateeqq worker pool...")
+        print("-"*60)
+        try:
+            pool_results = check_images_in_pool(test_images, max_workers=1, cache_preprocessed=True)
+            for test_img, result in zip(test_images, pool_results):
+                print_result(test_img, result)
+        except Exception as e:
+            print(f"  ⚠️ Worker pool check unavailable: {e}")
+        finally:
+            shutdown_detector_pool()
+    finally:
+        # Cleanup
+        print("\n5. Cleaning up test images...")
+        for test_img in test_images:
+            if os.path.exists(test_img):
+                os.remove(test_img)
+                print(f"   Removed {test_img}")
+
+    print("\n" + "="*60)
+    print("TEST COMPLETE")
+    print("="*60)
+    print("\n✅ AI Detection is working correctly!")
+    print("   The model is making real predictions based on image content.")
+    print("\n📝 Next steps:")
+    print("   1. Stop the backend server if it's running (Ctrl+C)")
+    print("   2. Restart the backend: python api_server_simple.py")
+    print("   3. The frontend will now get real AI detection results!")
+    print("="*60)
+
+
+# Guarded so the spawned pool workers can import this module without re-running the test
+if __name__ == "__main__":
+    main()